@@ -0,0 +1,43 @@
+# Compares serial fitness evaluation with the parallel and tensor backends of SymbolicRegressionFitness.EvaluateBatch
+# Usage: python benchmarks/evaluation_backends.py [n_rows] [n_trees] [n_jobs]
+import sys
+import time
+import numpy as np
+from copy import deepcopy
+
+from pynsgp.Nodes.SymbolicRegressionNodes import *
+from pynsgp.Fitness.FitnessFunction import SymbolicRegressionFitness
+from pynsgp.Variation import Variation
+
+n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+n_trees = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+n_jobs = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+np.random.seed(42)
+X = np.random.randn( n_rows, 5 )
+y = X[:,0] * X[:,1] + np.sin( X[:,2] )
+
+functions = [ AddNode(), SubNode(), MulNode(), DivNode(), LogNode(), SinNode(), CosNode() ]
+terminals = [ EphemeralRandomConstantNode() ] + [ FeatureNode(i) for i in range(X.shape[1]) ]
+trees = [ Variation.GenerateRandomTree( functions, terminals, 5, method='grow' ) for _ in range(n_trees) ]
+for t in trees:
+	t.GetHumanExpression()	# draws the constants
+
+print('rows:', n_rows, 'trees:', n_trees, 'n_jobs:', n_jobs)
+reference_errors = None
+reference_time = None
+for name, jobs, backend, compiled in [ ('serial', 1, 'process', False), ('serial compiled', 1, 'process', True),
+	('thread', n_jobs, 'thread', True), ('thread_rows', n_jobs, 'thread_rows', True), ('process', n_jobs, 'process', True),
+	('tensor', 1, 'tensor', True) ]:
+	fitness_function = SymbolicRegressionFitness( X, y, use_compiled_evaluation=compiled )
+	batch = deepcopy( trees )
+	start = time.time()
+	fitness_function.EvaluateBatch( batch, n_jobs=jobs, backend=backend )
+	elapsed = time.time() - start
+	fitness_function.ReleaseWorkers()
+	errors = np.array( [t.objectives[0] for t in batch] )
+	if reference_errors is None:
+		reference_errors = errors
+		reference_time = elapsed
+	print( '{:<16}{:>8.3f} s\tspeed-up: {:.2f}\tsame errors: {}'.format( name, elapsed,
+		reference_time / elapsed, np.allclose( errors, reference_errors, equal_nan=True ) ) )
@@ -1,3 +1,4 @@
+import os
 import numpy as np
 from numpy.random import random, randint
 import time
@@ -5,6 +6,12 @@ from copy import deepcopy
 
 from pynsgp.Variation import Variation
 from pynsgp.Selection import Selection
+from pynsgp.Evolution import Survival
+from pynsgp.Evolution.Population import Population
+from pynsgp.Evolution.ParetoArchive import ParetoArchive
+from pynsgp.Nodes.SubtreeStore import SubtreeStore
+from pynsgp.Nodes.PrimitiveSet import PrimitiveSet
+from pynsgp.Nodes.Simplification import Simplify
 
 
 class pyNSGP:
@@ -26,6 +33,17 @@ class pyNSGP:
 		max_tree_size=100,
 		tournament_size=4,
 		penalize_duplicates=True,
+		sorting_engine='auto',
+		use_copy_on_write=False,
+		use_hash_consing=False,
+		use_simplification=False,
+		n_jobs=1,
+		parallel_backend='process',
+		steady_state=False,
+		constant_optimization=None,
+		constant_optimization_top_k=10,
+		constant_optimization_budget=100,
+		constant_optimization_iterations=10,
 		verbose=False
 		):
 
@@ -33,6 +51,7 @@ class pyNSGP:
 		self.fitness_function = fitness_function
 		self.functions = functions
 		self.terminals = terminals
+		self.primitive_set = PrimitiveSet( functions, terminals )
 		self.crossover_rate = crossover_rate
 		self.mutation_rate = mutation_rate
 		self.op_mutation_rate = op_mutation_rate
@@ -46,6 +65,46 @@ class pyNSGP:
 		self.max_tree_size = max_tree_size
 		self.tournament_size = tournament_size
 		self.penalize_duplicates = penalize_duplicates
+		if sorting_engine not in Survival.SORTING_ENGINES:
+			raise ValueError('Unrecognized sorting engine '+str(sorting_engine))
+		self.sorting_engine = sorting_engine
+		# with the 'incremental' engine, the ranks of the population are kept from one generation to the next
+		self._archive = None
+		# offspring share the unchanged subtrees of their parents instead of being deep copies
+		self.use_copy_on_write = use_copy_on_write
+		# identical subtrees of the population are stored once; needs copy-on-write, as stored nodes are shared
+		if use_hash_consing and not use_copy_on_write:
+			raise ValueError('Hash-consing requires use_copy_on_write')
+		self.use_hash_consing = use_hash_consing
+		self.subtree_store = SubtreeStore() if use_hash_consing else None
+		# new trees are simplified before they are evaluated (see Simplification.Simplify)
+		self.use_simplification = use_simplification
+		# with n_jobs != 1, offspring are generated first and then evaluated as a batch by parallel workers;
+		# the 'tensor' and 'dag' backends evaluate batches in this thread, whatever n_jobs
+		self.n_jobs = n_jobs
+		self.parallel_backend = parallel_backend
+		self.evaluates_in_batches = n_jobs != 1 or parallel_backend in ('tensor', 'dag')
+		# with steady_state, every offspring replaces the worst individual as soon as it is evaluated, rather than
+		# at the end of a generation; with n_jobs != 1, workers evaluate offspring asynchronously all the time
+		if steady_state and n_jobs != 1 and parallel_backend not in ('process', 'thread'):
+			raise ValueError('Steady-state evolution needs the process or thread backend')
+		if steady_state and getattr(fitness_function, 'evaluation_mode', 'full') != 'full':
+			raise ValueError('Steady-state evolution needs evaluation_mode=\'full\'')
+		self.steady_state = steady_state
+		self._steady_state_insertions = 0
+		# after every generation, the constants of copies of the front ('front') or of the constant_optimization_top_k
+		# individuals with the smallest error ('top_k') are tuned, within constant_optimization_budget evaluations in
+		# total and constant_optimization_iterations steps per individual; the copies that improve replace the originals
+		if constant_optimization not in (None, 'front', 'top_k'):
+			raise ValueError('Unrecognized constant optimization '+str(constant_optimization))
+		if constant_optimization is not None and (steady_state or getattr(fitness_function, 'evaluation_mode', 'full') != 'full'):
+			raise ValueError('Constant optimization needs generational evolution with evaluation_mode=\'full\'')
+		self.constant_optimization = constant_optimization
+		self.constant_optimization_top_k = constant_optimization_top_k
+		self.constant_optimization_budget = constant_optimization_budget
+		self.constant_optimization_iterations = constant_optimization_iterations
+		# individuals of the population whose constants were tuned already, which are not tuned again
+		self._tuned_individuals = set()
 
 		self.generations = 0
 
@@ -65,91 +124,405 @@ class pyNSGP:
 		if must_terminate and self.verbose:
 			print('Terminating at\n\t', 
 				self.generations, 'generations\n\t', self.fitness_function.evaluations, 'evaluations\n\t', np.round(elapsed_time,2), 'seconds')
+			if getattr(self.fitness_function, 'fitness_memo', None) is not None:
+				print('\t', self.fitness_function.cache_hits, 'cache hits')
+			if getattr(self.fitness_function, 'evaluation_mode', 'full') != 'full':
+				print('\t', self.fitness_function.rows_evaluated, 'rows evaluated')
+			subtree_cache = getattr(self.fitness_function, 'subtree_cache', None)
+			if subtree_cache is not None:
+				print('Subtree cache:', subtree_cache.GetStatistics())
+			if self.subtree_store is not None:
+				print('Subtree store:', len(self.subtree_store), 'distinct subtrees')
 
 		return must_terminate
 
 
 	def Run(self):
 
+		try:
+			self.Initialize()
+			self.RunGenerations()
+		finally:
+			self.ReleaseWorkers()
+
+
+	def Initialize(self):
 		self.start_time = time.time()
+		self._InitializePopulation()
 
-		self.population = []
 
-		# ramped half-n-half
-		curr_max_depth = self.min_depth
-		init_depth_interval = self.pop_size / (self.initialization_max_tree_height - self.min_depth + 1)
-		next_depth_interval = init_depth_interval
+	def RunGenerations(self, how_many=-1):
+		# performs generations until termination or, if how_many > 0, until how_many more generations
+		# have been performed; returns whether the run must terminate
+		if self.steady_state:
+			return self._RunSteadyState(how_many)
+		performed = 0
+		must_terminate = self.__ShouldTerminate()
+		while not must_terminate and (how_many <= 0 or performed < how_many):
+			self._PerformGeneration()
+			performed += 1
 
-		for i in range( self.pop_size ):
-			if i >= next_depth_interval:
-				next_depth_interval += init_depth_interval
-				curr_max_depth += 1
+			if self.verbose:
+				print ('g:',self.generations,'elite obj1:', np.round(self.fitness_function.elite.objectives[0],3), ', size:', self.fitness_function.elite.GetSize())
 
-			t = Variation.GenerateRandomTree( self.functions, self.terminals, curr_max_depth, curr_height=0, 
-				method='grow' if np.random.random() < 0.5 else 'full', min_depth=self.min_depth )
-			self.fitness_function.Evaluate( t )
-			self.population.append( t )
+			must_terminate = self.__ShouldTerminate()
 
+		self.population.StoreInIndividuals()
+		return must_terminate
 
 
-		while not self.__ShouldTerminate():
+	def ReleaseWorkers(self):
+		if self.evaluates_in_batches:
+			self.fitness_function.ReleaseWorkers()
 
-			selected = Selection.TournamentSelect( self.population, self.pop_size, tournament_size=self.tournament_size )
 
-			O = []
-			for i in range( self.pop_size ):
-				o = deepcopy(selected[i])
-				if ( random() < self.crossover_rate ):
-					o = Variation.SubtreeCrossover( o, selected[ randint( self.pop_size ) ] )
-				if ( random() < self.mutation_rate ):
-					o = Variation.SubtreeMutation( o, self.functions, self.terminals, max_height=self.initialization_max_tree_height )
-				if ( random() < self.op_mutation_rate ):
-					o = Variation.OnePointMutation( o, self.functions, self.terminals )
+	def ReceiveMigrants(self, migrants):
+		# evaluated individuals from another population compete with this population for survival
+		if self.subtree_store is not None:
+			migrants = [ self.subtree_store.Intern( m ) for m in migrants ]
+		self.population = self._SelectSurvivors( self.population.Concatenate( Population(migrants) ) )
+		self.population.StoreInIndividuals()
 
-				if (len(o.GetSubtree()) > self.max_tree_size) or (o.GetHeight() < self.min_depth):
-					del o
-					o = deepcopy( selected[i] )
-				else:
-					self.fitness_function.Evaluate(o)
 
-				O.append(o)
+	def _InitializePopulation(self):
 
+		population = self.primitive_set.GenerateRampedHalfAndHalf( self.pop_size, self.min_depth, self.initialization_max_tree_height )
 
-			PO = self.population+O
-			
-			new_population = []
-			fronts = self.FastNonDominatedSorting(PO)
-			self.latest_front = deepcopy(fronts[0])
+		for i in range( self.pop_size ):
+			if self.use_simplification:
+				# trees that would become shallower than min_depth are kept as they are
+				simplified = Simplify( deepcopy( population[i] ) )
+				if simplified.GetHeight() >= self.min_depth:
+					population[i] = simplified
+			if self.subtree_store is not None:
+				population[i] = self.subtree_store.Intern( population[i] )
+			if not self.evaluates_in_batches:
+				self.fitness_function.Evaluate( population[i] )
 
-			curr_front_idx = 0
-			while curr_front_idx < len(fronts) and len(fronts[curr_front_idx]) + len(new_population) <= self.pop_size:
-				self.ComputeCrowdingDistances( fronts[curr_front_idx] )
-				for p in fronts[curr_front_idx]:
-					new_population.append(p)
-				curr_front_idx += 1
+		if self.evaluates_in_batches:
+			self.fitness_function.EvaluateBatch( population, n_jobs=self.n_jobs, backend=self.parallel_backend )
 
-			if len(new_population) < self.pop_size:
-				# fill in remaining
-				self.ComputeCrowdingDistances( fronts[curr_front_idx] )
-				fronts[curr_front_idx].sort(key=lambda x: x.crowding_distance, reverse=True) 
+		self.population = Population( population )
 
-				while len(fronts[curr_front_idx]) > 0 and len(new_population) < self.pop_size:
-					new_population.append( fronts[curr_front_idx][0] )	# pop first because they were sorted in desc order
-					fronts[curr_front_idx].pop(0)
 
-				# clean up leftovers
-				while len(fronts[curr_front_idx]) > 0:
-					del fronts[curr_front_idx][0]
+	def _PerformGeneration(self):
 
-			self.population = new_population
+		# fitness functions that score offspring on part of the rows rescore or inspect the population first
+		evaluates_subsets = getattr(self.fitness_function, 'evaluation_mode', 'full') != 'full'
+		if evaluates_subsets:
+			self.fitness_function.PrepareGeneration( self.population )
+			self.population.UpdateObjectives()
+			self._archive = None
 
-			self.generations = self.generations + 1
+		selected = Selection.TournamentSelectIndices( self.population.ranks, self.population.crowding_distances, self.pop_size, tournament_size=self.tournament_size )
+		selected = [ self.population.individuals[i] for i in selected.tolist() ]
 
-			if self.verbose:
-				print ('g:',self.generations,'elite obj1:', np.round(self.fitness_function.elite.objectives[0],3), ', size:', len(self.fitness_function.elite.GetSubtree()))
+		O = []
+		to_evaluate = []
+		for i in range( self.pop_size ):
+			o, must_evaluate = self._Vary( selected[i], lambda: selected[ randint( self.pop_size ) ] )
+			if must_evaluate:
+				if not self.evaluates_in_batches:
+					self.fitness_function.Evaluate(o)
+				else:
+					to_evaluate.append(o)
+
+			O.append(o)
+
+		if len(to_evaluate) > 0:
+			self.fitness_function.EvaluateBatch( to_evaluate, n_jobs=self.n_jobs, backend=self.parallel_backend )
+
+		PO = self.population.Concatenate( Population(O) )
+
+		self.population = self._SelectSurvivors(PO)
+
+		if evaluates_subsets:
+			# only the front (and thus the elite) is evaluated on all rows
+			self.fitness_function.EvaluateOnAllRows( self.latest_front )
+			self.population.UpdateObjectives()
+			self._archive = None
+
+		if self.constant_optimization is not None:
+			self._OptimizeConstants()
+
+		self.generations = self.generations + 1
+
+
+	def _Vary(self, parent, get_donor):
+		# offspring of parent, with a donor from get_donor() for crossover, and whether it must be evaluated;
+		# offspring that are too large or too shallow are replaced by a copy of parent, with its objectives
+		if self.use_copy_on_write:
+			# the variation operators leave their inputs untouched and return new trees
+			o = parent
+		else:
+			o = deepcopy(parent)
+		if ( random() < self.crossover_rate ):
+			o = Variation.SubtreeCrossover( o, get_donor(), copy_on_write=self.use_copy_on_write )
+		if ( random() < self.mutation_rate ):
+			o = Variation.SubtreeMutation( o, self.functions, self.terminals, max_height=self.initialization_max_tree_height, copy_on_write=self.use_copy_on_write, primitive_set=self.primitive_set )
+		if ( random() < self.op_mutation_rate ):
+			o = Variation.OnePointMutation( o, self.functions, self.terminals, copy_on_write=self.use_copy_on_write, primitive_set=self.primitive_set )
+
+		if o is not parent and self.use_simplification:
+			# before the checks, as simplified trees can be shallower than min_depth
+			o = Simplify( o, copy_on_write=self.use_copy_on_write )
+
+		if (o.GetSize() > self.max_tree_size) or (o.GetHeight() < self.min_depth):
+			del o
+			return self._CopyIndividual( parent ), False
+
+		if o is parent:
+			return self._CopyIndividual( parent ), True
+		if self.subtree_store is not None:
+			o = self.subtree_store.Intern( o )
+		return o, True
+
+
+	def _RunSteadyState(self, how_many=-1):
+		# like RunGenerations, where a generation is the insertion of pop_size offspring
+		self._RankForSteadyState()
+		n_workers = self.n_jobs if self.n_jobs > 0 else os.cpu_count()
+		# twice as many evaluations as workers are kept started, so that no worker waits for the next offspring
+		max_started = 2 * n_workers if self.n_jobs != 1 else 0
+		started = 0
+
+		performed = 0
+		must_terminate = self.__ShouldTerminate()
+		while not must_terminate and (how_many <= 0 or performed < how_many):
+			within_budget = self.max_evaluations <= 0 or self.fitness_function.evaluations + started < self.max_evaluations
+			if started == 0 or (started < max_started and within_budget):
+				parents = Selection.TournamentSelectIndices( self.population.ranks, self.population.crowding_distances, 2, tournament_size=self.tournament_size ).tolist()
+				o, must_evaluate = self._Vary( self.population.individuals[parents[0]], lambda: self.population.individuals[parents[1]] )
+				if must_evaluate and self.fitness_function.StartEvaluation( o, n_jobs=self.n_jobs, backend=self.parallel_backend ):
+					started += 1
+					continue
+			else:
+				o = self.fitness_function.WaitForEvaluation()
+				started -= 1
+
+			self._InsertIntoPopulation( o )
+			self._steady_state_insertions += 1
+			if self._steady_state_insertions % self.pop_size == 0:
+				self.generations = self.generations + 1
+				performed += 1
+				if self.verbose:
+					print ('g:',self.generations,'elite obj1:', np.round(self.fitness_function.elite.objectives[0],3), ', size:', self.fitness_function.elite.GetSize())
+			must_terminate = self.__ShouldTerminate()
+
+		# the evaluations that are still running are not wasted
+		while started > 0:
+			self._InsertIntoPopulation( self.fitness_function.WaitForEvaluation() )
+			started -= 1
+
+		self.latest_front = [ self.population.individuals[i] for i in np.flatnonzero( self.population.ranks == 0 ).tolist() ]
+		self.population.StoreInIndividuals()
+		return must_terminate
+
+
+	def _RankForSteadyState(self):
+		# ranks the population, where duplicates have an infinite rank and do not count for the ranks of
+		# the others, as with the insertions of _InsertIntoPopulation
+		P = self.population
+		self._ComputeFronts( P )
+		ranked = np.isfinite( P.ranks )
+		_, ranks = Survival.FastNonDominatedSorting( P.objectives[ranked] )
+		P.ranks[ranked] = ranks
+		self._UpdateCrowdingDistances( np.unique( ranks ) )
+		self._fingerprint_counts = {}
+		for i in np.flatnonzero( ranked ).tolist():
+			fingerprint = P.individuals[i].cached_output
+			self._fingerprint_counts[fingerprint] = self._fingerprint_counts.get( fingerprint, 0 ) + 1
+
+
+	def _InsertIntoPopulation(self, o):
+		# adds the evaluated individual o and removes the least crowded individual of the last front, which
+		# can be o itself; that individual dominates no other one, so no other rank changes on removal
+		P = self.population
+		if self.penalize_duplicates and self._fingerprint_counts.get( o.cached_output, 0 ) > 0:
+			self._InsertDuplicate( o )
+			return
+
+		new_rank, ranks = Survival.InsertIntoRanking( P.objectives, P.ranks, o.objectives )
+		changed_ranks = set( np.concatenate( (P.ranks[ranks != P.ranks], ranks[ranks != P.ranks]) ).tolist() )
+		PO = P.Concatenate( Population( [o] ) )
+		PO.ranks = np.append( ranks, new_rank )
+
+		worst_rank = PO.ranks.max()
+		last_front = np.flatnonzero( PO.ranks == worst_rank )
+		if np.isinf( worst_rank ):
+			removed = last_front[0]
+		else:
+			removed = last_front[ np.argmin( Survival.ComputeCrowdingDistances( PO.objectives[last_front] ) ) ]
+		removed_individual = PO.individuals[removed]
+		self.population = PO.Subset( np.delete( np.arange( len(PO) ), removed ) )
+
+		if removed_individual is not o:
+			self._fingerprint_counts[o.cached_output] = self._fingerprint_counts.get( o.cached_output, 0 ) + 1
+			changed_ranks.add( new_rank )
+			if np.isfinite( worst_rank ):
+				self._fingerprint_counts[removed_individual.cached_output] -= 1
+		changed_ranks.add( worst_rank )
+		if self.subtree_store is not None:
+			self.subtree_store.Release( removed_individual )
+
+		self._UpdateCrowdingDistances( changed_ranks )
+
+
+	def _InsertDuplicate(self, o):
+		# as in _PenalizeDuplicates, the individual with the same output that comes first keeps its front:
+		# if o dominates it, o takes its place and the population is ranked again, otherwise o is discarded
+		P = self.population
+		existing = [ i for i in np.flatnonzero( np.isfinite( P.ranks ) ).tolist() if P.individuals[i].cached_output == o.cached_output ][0]
+		new_objectives = np.asarray( o.objectives, dtype=float )
+		if not (np.all( new_objectives <= P.objectives[existing] ) and np.any( new_objectives < P.objectives[existing] )):
+			if self.subtree_store is not None:
+				self.subtree_store.Release( o )
+			return
+
+		replaced_individual = P.individuals[existing]
+		P.individuals[existing] = o
+		P.objectives[existing] = new_objectives
+		ranked = np.isfinite( P.ranks )
+		_, ranks = Survival.FastNonDominatedSorting( P.objectives[ranked] )
+		P.ranks[ranked] = ranks
+		self._UpdateCrowdingDistances( np.unique( ranks ) )
+		if self.subtree_store is not None:
+			self.subtree_store.Release( replaced_individual )
+
+
+	def _UpdateCrowdingDistances(self, ranks):
+		P = self.population
+		for rank in ranks:
+			front = np.flatnonzero( P.ranks == rank )
+			if len(front) > 0:
+				P.crowding_distances[front] = Survival.ComputeCrowdingDistances( P.objectives[front] )
+
+
+	def _SelectSurvivors(self, PO):
+		# the pop_size best individuals of the Population PO, by rank and then crowding distance
+		fronts = self._ComputeFronts(PO, use_archive=True)
+		# evaluated individuals are never modified, so there is no need to copy them
+		self.latest_front = [ PO.individuals[i] for i in fronts[0].tolist() ]
+
+		survivors = []
+		n_survivors = 0
+		curr_front_idx = 0
+		while curr_front_idx < len(fronts) and len(fronts[curr_front_idx]) + n_survivors <= self.pop_size:
+			front = fronts[curr_front_idx]
+			crowding_distances, order = Survival.ComputeCrowdingDistances( PO.objectives[front], return_order=True )
+			PO.crowding_distances[front] = crowding_distances
+			# survivors are kept in the order of the crowding distance computation
+			survivors.append( front[order] )
+			n_survivors += len(front)
+			curr_front_idx += 1
+
+		if n_survivors < self.pop_size:
+			# fill in remaining with the least crowded individuals of the next front
+			last_front = fronts[curr_front_idx]
+			crowding_distances, order = Survival.ComputeCrowdingDistances( PO.objectives[last_front], return_order=True )
+			PO.crowding_distances[last_front] = crowding_distances
+			last_front = last_front[order]
+			chosen = Survival.SelectByCrowdingDistance( crowding_distances[order], self.pop_size - n_survivors )
+			survivors.append( last_front[chosen] )
+
+		survivors = np.concatenate( survivors )
+
+		discarded = np.ones( len(PO), dtype=bool )
+		discarded[survivors] = False
+		discarded = np.flatnonzero( discarded ).tolist()
+		if self.subtree_store is not None:
+			# the subtrees of the discarded individuals are released
+			for i in discarded:
+				self.subtree_store.Release( PO.individuals[i] )
+		if self._archive is not None:
+			self._archive.RemoveMany( [ id(PO.individuals[i]) for i in discarded ] )
+
+		return PO.Subset( survivors )
+
+
+	def _OptimizeConstants(self):
+		# the most accurate candidates are tuned first, until the budget of this generation is spent
+		P = self.population
+		if self.constant_optimization == 'front':
+			candidates = np.flatnonzero( P.ranks == 0 )
+		else:
+			candidates = np.arange( len(P) )
+		candidates = candidates[ np.argsort( P.objectives[candidates, 0], kind='stable' ) ]
+		if self.constant_optimization == 'top_k':
+			candidates = candidates[:self.constant_optimization_top_k]
+		self._tuned_individuals = set( [p for p in P.individuals if p in self._tuned_individuals] )
+
+		end_of_budget = self.fitness_function.evaluations + self.constant_optimization_budget
+		improved = False
+		for i in candidates.tolist():
+			remaining = end_of_budget - self.fitness_function.evaluations
+			if self.max_evaluations > 0:
+				# every Levenberg-Marquardt call stops at max_evaluations
+				remaining = min( remaining, self.max_evaluations - self.fitness_function.evaluations )
+			if remaining <= 0:
+				break
+			if not np.isfinite( P.objectives[i, 0] ) or P.individuals[i] in self._tuned_individuals:
+				continue
+			# the original may share nodes with other individuals, so a copy is tuned
+			tuned = P.individuals[i].CopySubtree()
+			if not self.fitness_function.OptimizeConstants( tuned, remaining, max_iterations=self.constant_optimization_iterations ) \
+				or not tuned.objectives[0] < P.objectives[i, 0]:
+				self._tuned_individuals.add( P.individuals[i] )
+				continue
+			if self.subtree_store is not None:
+				self.subtree_store.Release( P.individuals[i] )
+				tuned = self.subtree_store.Intern( tuned )
+			self._tuned_individuals.add( tuned )
+			P.individuals[i] = tuned
+			P.objectives[i] = tuned.objectives
+			improved = True
+
+		if improved:
+			# the tuned individuals may dominate others now
+			self._archive = None
+			fronts = self._ComputeFronts( P )
+			for front in fronts:
+				P.crowding_distances[front] = Survival.ComputeCrowdingDistances( P.objectives[front] )
+			self.latest_front = [ P.individuals[i] for i in fronts[0].tolist() ]
+
+
+	def _CopyIndividual(self, individual):
+		if self.subtree_store is not None:
+			# a new root that refers to the same stored subtrees
+			return self.subtree_store.Intern( individual )
+		if self.use_copy_on_write:
+			return individual.ShallowCopy()
+		return deepcopy(individual)
 
 
 	def FastNonDominatedSorting(self, population):
+		population = Population( population )
+		index_fronts = self._ComputeFronts( population )
+		population.StoreInIndividuals()
+		return [ [population.individuals[i] for i in index_front.tolist()] for index_front in index_fronts ]
+
+
+	def _ComputeFronts(self, population, use_archive=False):
+		# sets the ranks of the Population and returns its fronts as arrays of indices
+		if self.sorting_engine == 'incremental' and use_archive:
+			index_fronts = self._SortWithArchive( population )
+		elif self.sorting_engine == 'legacy':
+			legacy_fronts = self._FastNonDominatedSortingLegacy( population.individuals )
+			positions = { id(p): i for i, p in enumerate(population.individuals) }
+			index_fronts = [ np.array( [positions[id(p)] for p in front], dtype=int ) for front in legacy_fronts ]
+			for rank, index_front in enumerate(index_fronts):
+				population.ranks[index_front] = rank
+		else:
+			index_fronts, ranks = Survival.FastNonDominatedSorting( population.objectives, engine=self.sorting_engine )
+			population.ranks = ranks.astype(float)
+
+		if self.penalize_duplicates:
+			index_fronts = self._PenalizeDuplicates( population, index_fronts )
+
+		return index_fronts
+
+
+	def _FastNonDominatedSortingLegacy(self, population):
 		rank_counter = 0
 		nondominated_fronts = []
 		dominated_individuals = {}
@@ -188,56 +561,49 @@ class pyNSGP:
 			rank_counter += 1
 			current_front = next_front
 
-		if self.penalize_duplicates:
-			already_seen = set()
-			discard_front = []
-			sorted_pop = sorted(population, key=lambda x: x.rank)
-			for p in sorted_pop: 
-				summarized_representation = p.cached_output
-				if summarized_representation not in already_seen:
-					already_seen.add(summarized_representation)
-				else:
-					# find p and remove it from its front
-					for i, q in enumerate(nondominated_fronts[p.rank]):
-						if nondominated_fronts[p.rank][i] == p:
-							nondominated_fronts[p.rank].pop(i)
-							break
-					p.rank = np.inf
-					discard_front.append(p)
-			if len(discard_front) > 0:
-				nondominated_fronts.append(discard_front)
-				# fix potentially-now-empty fronts
-				nondominated_fronts = [front for front in nondominated_fronts if len(front) > 0]
-
-
 		return nondominated_fronts
 
 
-	def ComputeCrowdingDistances(self, front):
-		number_of_objs = len(front[0].objectives)
-		front_size = len(front)
-
-		for p in front:
-			p.crowding_distance = 0
+	def _SortWithArchive(self, population):
+		# the archive holds the survivors of the previous generation, so only the offspring are inserted
+		if self._archive is None:
+			self._archive = ParetoArchive()
+		archive = self._archive
+		positions = { id(p): i for i, p in enumerate(population.individuals) }
+		archive.RemoveMany( [ key for key in archive.GetKeys() if key not in positions ] )
+		for i, p in enumerate(population.individuals):
+			if id(p) not in archive:
+				archive.Insert( id(p), population.objectives[i] )
+
+		index_fronts = [ np.sort( np.array( [positions[key] for key in keys], dtype=int ) ) for keys in archive.GetFronts() ]
+		for rank, index_front in enumerate(index_fronts):
+			population.ranks[index_front] = rank
+		return index_fronts
+
+
+	def _PenalizeDuplicates(self, population, index_fronts):
+		# among individuals with the same output, only the first one by rank keeps its front
+		already_seen = set()
+		is_duplicate = np.zeros( len(population), dtype=bool )
+		sorted_indices = np.argsort( population.ranks, kind='stable' )
+		for i in sorted_indices.tolist():
+			summarized_representation = population.individuals[i].cached_output
+			if summarized_representation not in already_seen:
+				already_seen.add(summarized_representation)
+			else:
+				is_duplicate[i] = True
+		if is_duplicate.any():
+			population.ranks[is_duplicate] = np.inf
+			index_fronts = [ index_front[~is_duplicate[index_front]] for index_front in index_fronts ]
+			# fix potentially-now-empty fronts
+			index_fronts = [ index_front for index_front in index_fronts if len(index_front) > 0 ]
+			index_fronts.append( sorted_indices[is_duplicate[sorted_indices]] )
+
+		return index_fronts
 
-		for i in range(number_of_objs):
-			front.sort(key=lambda x: x.objectives[i], reverse=False)
 
-			front[0].crowding_distance = front[-1].crowding_distance = np.inf
-
-			min_obj = front[0].objectives[i]
-			max_obj = front[-1].objectives[i]
-
-			if min_obj == max_obj:
-				continue
-
-			for j in range(1, front_size - 1):
-
-				if np.isinf(front[j].crowding_distance):
-					# if extrema from previous sorting
-					continue
-
-				prev_obj = front[j-1].objectives[i]
-				next_obj = front[j+1].objectives[i]
-
-				front[j].crowding_distance += (next_obj - prev_obj)/(max_obj - min_obj)
+	def ComputeCrowdingDistances(self, front):
+		crowding_distances = Survival.ComputeCrowdingDistances( Survival.GetObjectivesMatrix(front) )
+		for p, d in zip( front, crowding_distances.tolist() ):
+			p.crowding_distance = d
+		return crowding_distances
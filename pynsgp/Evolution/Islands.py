@@ -0,0 +1,182 @@
+import numpy as np
+import time
+import traceback
+from multiprocessing import get_context
+
+from pynsgp.Evolution import Survival
+from pynsgp.Evolution.Evolution import pyNSGP
+from pynsgp.Evolution.Population import Population
+
+
+MIGRATION_TOPOLOGIES = ('ring', 'fully_connected', 'random')
+
+
+def _RunIsland( connection, fitness_function, functions, terminals, seed, nsgp_settings ):
+	# body of an island process: evolves one pyNSGP, as the driver commands through connection
+	np.random.seed( seed )
+	nsgp = None
+	try:
+		nsgp = pyNSGP( fitness_function, functions, terminals, **nsgp_settings )
+		nsgp.Initialize()
+		while True:
+			command, arguments = connection.recv()
+			if command == 'evolve':
+				how_many, migrants, migration_size = arguments
+				if len(migrants) > 0:
+					nsgp.ReceiveMigrants( migrants )
+				must_terminate = nsgp.RunGenerations( how_many )
+				front = nsgp.latest_front
+				if len(front) > migration_size:
+					front = [ front[i] for i in np.random.choice( len(front), migration_size, replace=False ).tolist() ]
+				connection.send( ('ok', (front, nsgp.fitness_function.evaluations, nsgp.generations, must_terminate)) )
+			else:
+				connection.send( ('ok', (nsgp.population.individuals, nsgp.latest_front, nsgp.fitness_function.elite)) )
+				break
+	except EOFError:
+		# the driver has stopped
+		pass
+	except Exception:
+		connection.send( ('error', traceback.format_exc()) )
+	finally:
+		if nsgp is not None:
+			nsgp.ReleaseWorkers()
+		connection.close()
+
+
+class pyNSGPIslands:
+	# Island model: n_islands pyNSGP populations evolve in separate processes, each with its own random
+	# numbers. Every migration_interval generations, each island sends at most migration_size individuals of
+	# its front to the islands it is connected to by topology, where they compete for survival. At the end,
+	# the fronts of all islands are merged into a global front.
+	# pop_size and max_generations hold for each island, max_evaluations for all islands together; the
+	# other keyword arguments are passed on to the pyNSGP of every island.
+
+	def __init__(
+		self,
+		fitness_function,
+		functions,
+		terminals,
+		n_islands=4,
+		migration_interval=10,
+		migration_size=10,
+		topology='ring',
+		max_evaluations=-1,
+		max_generations=-1,
+		max_time=-1,
+		verbose=False,
+		**nsgp_settings
+		):
+
+		if n_islands < 1:
+			raise ValueError('The number of islands must be positive')
+		if topology not in MIGRATION_TOPOLOGIES:
+			raise ValueError('Unrecognized migration topology '+str(topology))
+		self.fitness_function = fitness_function
+		self.functions = functions
+		self.terminals = terminals
+		self.n_islands = n_islands
+		self.migration_interval = migration_interval
+		self.migration_size = migration_size
+		self.topology = topology
+		self.max_evaluations = max_evaluations
+		self.max_generations = max_generations
+		self.max_time = max_time
+		self.verbose = verbose
+		self.nsgp_settings = nsgp_settings
+
+		self.generations = 0
+
+
+	def Run(self):
+
+		self.start_time = time.time()
+
+		island_settings = dict( self.nsgp_settings )
+		island_settings['max_evaluations'] = int(np.ceil( self.max_evaluations / self.n_islands )) if self.max_evaluations > 0 else -1
+		island_settings['max_generations'] = self.max_generations
+		island_settings['max_time'] = self.max_time
+		seeds = np.random.randint( 2**31 - 1, size=self.n_islands ).tolist()
+
+		context = get_context()
+		connections = []
+		processes = []
+		try:
+			for seed in seeds:
+				connection, island_connection = context.Pipe()
+				process = context.Process( target=_RunIsland,
+					args=(island_connection, self.fitness_function, self.functions, self.terminals, seed, island_settings) )
+				process.start()
+				island_connection.close()
+				connections.append( connection )
+				processes.append( process )
+
+			migrants = [ [] for _ in range(self.n_islands) ]
+			while True:
+				for connection, island_migrants in zip( connections, migrants ):
+					connection.send( ('evolve', (self.migration_interval, island_migrants, self.migration_size)) )
+				results = [ self._Receive( connection ) for connection in connections ]
+				emigrants = [ r[0] for r in results ]
+				self.fitness_function.evaluations = sum( [r[1] for r in results] )
+				self.generations = max( [r[2] for r in results] )
+
+				if self.verbose:
+					print ('g:', self.generations, 'evaluations:', self.fitness_function.evaluations,
+						'best obj1 of the island fronts:', np.round( min( [p.objectives[0] for front in emigrants for p in front] ), 3 ))
+
+				if all( [r[3] for r in results] ):
+					break
+				migrants = self._Migrate( emigrants )
+
+			for connection in connections:
+				connection.send( ('finish', None) )
+			results = [ self._Receive( connection ) for connection in connections ]
+		finally:
+			for connection in connections:
+				connection.close()
+			for process in processes:
+				process.join()
+
+		self._MergeIslands( results )
+
+		if self.verbose:
+			print('Terminating at\n\t',
+				self.generations, 'generations\n\t', self.fitness_function.evaluations, 'evaluations\n\t', np.round(time.time() - self.start_time,2), 'seconds')
+
+
+	def _Receive(self, connection):
+		status, payload = connection.recv()
+		if status == 'error':
+			raise RuntimeError('An island failed:\n'+payload)
+		return payload
+
+
+	def _Migrate(self, emigrants):
+		# migrants received by each island from the islands it is connected to
+		n = self.n_islands
+		if n == 1:
+			return [ [] ]
+		if self.topology == 'ring':
+			return [ list(emigrants[(i - 1) % n]) for i in range(n) ]
+		if self.topology == 'fully_connected':
+			return [ [p for j in range(n) if j != i for p in emigrants[j]] for i in range(n) ]
+		# 'random': every island receives from another island chosen at random
+		sources = [ (i + np.random.randint( 1, n )) % n for i in range(n) ]
+		return [ list(emigrants[j]) for j in sources ]
+
+
+	def _MergeIslands(self, results):
+		self.population = Population( [p for r in results for p in r[0]] )
+
+		# global front: the non-dominated individuals among the fronts of all islands, without duplicates
+		candidates = Population( [p for r in results for p in r[1]] )
+		index_fronts, _ = Survival.FastNonDominatedSorting( candidates.objectives )
+		already_seen = set()
+		self.latest_front = []
+		for i in index_fronts[0].tolist():
+			p = candidates.individuals[i]
+			if p.cached_output not in already_seen:
+				already_seen.add( p.cached_output )
+				self.latest_front.append( p )
+
+		elites = [ r[2] for r in results ]
+		self.fitness_function.elite = min( elites, key=lambda elite: elite.objectives[0] )
@@ -0,0 +1,118 @@
+import math
+from bisect import bisect_right, insort
+from itertools import count
+
+
+class ParetoArchive:
+	# Non-dominated sorting of a changing set of points with two objectives (to minimize). Every front is a
+	# list of entries (obj1, obj2, serial, key) sorted by obj1, along which obj2 does not increase. Inserting a
+	# point only moves the points it dominates to later fronts, and removing one only moves the points that
+	# nothing else dominated to earlier fronts, so ranks change only where needed.
+
+	def __init__( self ):
+		self.fronts = []
+		self._entries = {}	# key -> (rank, entry)
+		self._serials = count()
+
+	def __len__( self ):
+		return len(self._entries)
+
+	def __contains__( self, key ):
+		return key in self._entries
+
+	def GetKeys( self ):
+		return list( self._entries.keys() )
+
+	def GetRank( self, key ):
+		return self._entries[key][0]
+
+	def GetFronts( self ):
+		# keys of the points of each front
+		return [ [entry[3] for entry in front] for front in self.fronts ]
+
+	def Insert( self, key, objectives ):
+		if len(objectives) != 2:
+			raise ValueError('The Pareto archive supports two objectives only')
+		obj1, obj2 = float(objectives[0]), float(objectives[1])
+		if math.isnan(obj1) or math.isnan(obj2):
+			raise ValueError('The Pareto archive does not support NaN objectives')
+		if key in self._entries:
+			self.Remove( key )
+		entry = (obj1, obj2, next(self._serials), key)
+
+		# a front dominates the point only if all earlier fronts do, so the rank is found by binary search
+		low, high = 0, len(self.fronts)
+		while low < high:
+			middle = (low + high) // 2
+			if _IsDominatedByFront( self.fronts[middle], entry ):
+				low = middle + 1
+			else:
+				high = middle
+
+		# the points of a front that the arriving points dominate move on to the next front
+		block = [ entry ]
+		rank = low
+		while len(block) > 0:
+			if rank == len(self.fronts):
+				self.fronts.append( [] )
+			front = self.fronts[rank]
+			dominated = [ e for e in _GetWindow( front, block ) if _IsDominatedByFront( block, e ) ]
+			for e in dominated:
+				front.pop( _GetPosition( front, e ) )
+			for e in block:
+				insort( front, e )
+				self._entries[e[3]] = (rank, e)
+			block = dominated
+			rank += 1
+
+	def Remove( self, key ):
+		rank, entry = self._entries.pop( key )
+		front = self.fronts[rank]
+		front.pop( _GetPosition( front, entry ) )
+
+		# the points of the next front that the leaving points dominated move up, unless the front still dominates them
+		block = [ entry ]
+		while len(block) > 0 and rank + 1 < len(self.fronts):
+			front = self.fronts[rank]
+			next_front = self.fronts[rank + 1]
+			freed = [ e for e in _GetWindow( next_front, block ) if _IsDominatedByFront( block, e ) and not _IsDominatedByFront( front, e ) ]
+			for e in freed:
+				next_front.pop( _GetPosition( next_front, e ) )
+				insort( front, e )
+				self._entries[e[3]] = (rank, e)
+			block = freed
+			rank += 1
+
+		while len(self.fronts) > 0 and len(self.fronts[-1]) == 0:
+			self.fronts.pop()
+
+	def RemoveMany( self, keys ):
+		# from the last fronts to the first ones, so that fewer points move
+		for key in sorted( keys, key=lambda key: -self._entries[key][0] ):
+			self.Remove( key )
+
+
+def _IsDominatedByFront( front, entry ):
+	# among the points of front with obj1 <= that of entry, the last one has the smallest obj2
+	i = bisect_right( front, (entry[0], math.inf, math.inf) ) - 1
+	if i < 0:
+		return False
+	other = front[i]
+	return other[1] <= entry[1] and (other[0] < entry[0] or other[1] < entry[1])
+
+
+def _GetWindow( front, block ):
+	# the points of front that can be dominated by a point of block: obj1 and obj2 at least the smallest of block
+	start = bisect_right( front, (block[0][0], -math.inf, -math.inf) )
+	window = []
+	min_obj2 = block[-1][1]
+	for e in front[start:]:
+		if e[1] < min_obj2:
+			break
+		window.append( e )
+	return window
+
+
+def _GetPosition( front, entry ):
+	# entries are unique, by their serial
+	return bisect_right( front, entry ) - 1
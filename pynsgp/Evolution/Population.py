@@ -0,0 +1,61 @@
+import numpy as np
+
+from pynsgp.Evolution import Survival
+
+
+def _AsMatrix( objectives, n ):
+	objectives = np.asarray( objectives, dtype=float )
+	if n == 0:
+		return objectives.reshape( 0, objectives.shape[-1] if objectives.ndim == 2 else 0 )
+	return objectives.reshape( n, -1 )
+
+
+class Population:
+	# The individuals of a population together with contiguous arrays of their objectives (one row per
+	# individual), ranks and crowding distances, so that sorting, truncation and selection work on arrays
+	# and refer to the individuals by index. Ranks are floats, as duplicates are given an infinite rank.
+
+	def __init__( self, individuals, objectives=None, ranks=None, crowding_distances=None ):
+		self.individuals = list( individuals )
+		n = len(self.individuals)
+		if objectives is None:
+			objectives = Survival.GetObjectivesMatrix( self.individuals )
+		self.objectives = _AsMatrix( objectives, n )
+		self.ranks = np.zeros( n ) if ranks is None else ranks
+		self.crowding_distances = np.zeros( n ) if crowding_distances is None else crowding_distances
+
+	def __len__( self ):
+		return len(self.individuals)
+
+	def __getitem__( self, i ):
+		return self.individuals[i]
+
+	def __iter__( self ):
+		return iter( self.individuals )
+
+	def Concatenate( self, other ):
+		if len(other) == 0:
+			return self.Subset( np.arange( len(self) ) )
+		if len(self) == 0:
+			return other.Subset( np.arange( len(other) ) )
+		return Population( self.individuals + other.individuals,
+			objectives=np.vstack( (self.objectives, other.objectives) ),
+			ranks=np.concatenate( (self.ranks, other.ranks) ),
+			crowding_distances=np.concatenate( (self.crowding_distances, other.crowding_distances) ) )
+
+	def Subset( self, indices ):
+		indices = np.asarray( indices, dtype=int )
+		return Population( [ self.individuals[i] for i in indices.tolist() ],
+			objectives=self.objectives[indices],
+			ranks=self.ranks[indices],
+			crowding_distances=self.crowding_distances[indices] )
+
+	def UpdateObjectives( self ):
+		# to call after the objectives of the individuals change, e.g., when they are scored on other rows
+		self.objectives = _AsMatrix( Survival.GetObjectivesMatrix( self.individuals ), len(self) )
+
+	def StoreInIndividuals( self ):
+		# copies ranks and crowding distances back to the attributes of the individuals
+		for p, rank, distance in zip( self.individuals, self.ranks.tolist(), self.crowding_distances.tolist() ):
+			p.rank = int(rank) if np.isfinite(rank) else rank
+			p.crowding_distance = distance
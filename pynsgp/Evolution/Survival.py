@@ -0,0 +1,176 @@
+import numpy as np
+from bisect import bisect_left
+
+from pynsgp.Evolution.ParetoArchive import ParetoArchive
+
+
+# 'incremental' sorts with a ParetoArchive, which pyNSGP keeps from one generation to the next
+SORTING_ENGINES = ('auto', 'numpy', 'sweep', 'legacy', 'incremental')
+
+
+def GetObjectivesMatrix( population ):
+	return np.array( [p.objectives for p in population], dtype=float )
+
+
+def FastNonDominatedSorting( objectives, engine='auto' ):
+	# returns the fronts (arrays of row indices, in ascending order) and the rank of every row
+	objectives = np.asarray( objectives, dtype=float )
+
+	if engine == 'auto':
+		if objectives.shape[1] == 2 and not np.isnan(objectives).any():
+			engine = 'sweep'
+		else:
+			engine = 'numpy'
+
+	if engine == 'sweep':
+		ranks = _ComputeRanksTwoObjectiveSweep( objectives )
+	elif engine == 'numpy':
+		ranks = _ComputeRanksNumPy( objectives )
+	elif engine == 'incremental':
+		ranks = _ComputeRanksIncremental( objectives )
+	else:
+		raise ValueError('Unrecognized sorting engine '+str(engine))
+
+	return _GroupRanksIntoFronts( ranks ), ranks
+
+
+def ComputeDominationMatrix( objectives, block_size=1024 ):
+	# D[i,j] is True iff row i dominates row j; built in blocks to bound the size of the temporaries
+	n = objectives.shape[0]
+	D = np.empty( (n, n), dtype=bool )
+	for start in range(0, n, block_size):
+		block = objectives[start:start+block_size, None, :]
+		D[start:start+block_size] = np.all( block <= objectives[None, :, :], axis=2 ) & np.any( block < objectives[None, :, :], axis=2 )
+	return D
+
+
+def InsertIntoRanking( objectives, ranks, new_objectives ):
+	# Adds a point to points with the given objectives and non-dominated sorting ranks: returns the rank of the
+	# new point and the updated ranks of the others. Only the points that the new point dominates can move to
+	# later fronts, so only those are ranked again. Points with an infinite rank (duplicates) are left out.
+	ranks = np.array( ranks, dtype=float )
+	new_objectives = np.asarray( new_objectives, dtype=float )
+	ranked = np.isfinite( ranks )
+	dominates_new = ranked & np.all( objectives <= new_objectives, axis=1 ) & np.any( objectives < new_objectives, axis=1 )
+	dominated_by_new = ranked & np.all( new_objectives <= objectives, axis=1 ) & np.any( new_objectives < objectives, axis=1 )
+	new_rank = ranks[dominates_new].max() + 1 if dominates_new.any() else 0.0
+
+	# the dominators of a point have smaller ranks, so they are updated before it
+	affected = np.flatnonzero( dominated_by_new )
+	affected = affected[ np.argsort( ranks[affected], kind='stable' ) ]
+	D = ComputeDominationMatrix( objectives[affected] )
+	updated_ranks = ranks[affected]
+	for k in range(len(affected)):
+		rank = new_rank + 1
+		dominators = np.flatnonzero( D[:k, k] )
+		if len(dominators) > 0:
+			rank = max( rank, updated_ranks[dominators].max() + 1 )
+		updated_ranks[k] = max( updated_ranks[k], rank )
+	ranks[affected] = updated_ranks
+
+	return new_rank, ranks
+
+
+def ComputeCrowdingDistances( objectives, return_order=False ):
+	# with return_order, also returns the order of the points after the sort by the last objective, which
+	# survivor selection keeps
+	objectives = np.asarray( objectives, dtype=float )
+	front_size, number_of_objs = objectives.shape
+	distances = np.zeros( front_size )
+	if front_size == 0:
+		return (distances, np.arange( 0 )) if return_order else distances
+
+	# each sort is stable and starts from the order of the previous one, so ties are broken like
+	# successive in-place sorts of the front would
+	order = np.arange( front_size )
+	for i in range(number_of_objs):
+		order = order[ np.argsort( objectives[order, i], kind='stable' ) ]
+		sorted_objs = objectives[order, i]
+
+		distances[order[0]] = distances[order[-1]] = np.inf
+
+		min_obj = sorted_objs[0]
+		max_obj = sorted_objs[-1]
+
+		if min_obj == max_obj:
+			continue
+
+		inner = order[1:-1]
+		increments = (sorted_objs[2:] - sorted_objs[:-2]) / (max_obj - min_obj)
+		# extrema from previous objectives stay infinite
+		distances[inner] = np.where( np.isinf(distances[inner]), distances[inner], distances[inner] + increments )
+
+	if return_order:
+		return distances, order
+	return distances
+
+
+def SelectByCrowdingDistance( distances, how_many ):
+	# indices of the how_many largest crowding distances, from the largest one; ties (e.g., the infinite
+	# distances of the boundary points) are broken by index, as in a stable descending sort
+	if how_many >= len(distances):
+		return np.arange( len(distances) )
+	if how_many <= 0:
+		return np.arange( 0 )
+	return np.argsort( -distances, kind='stable' )[:how_many]
+
+
+def _ComputeRanksNumPy( objectives ):
+	n = objectives.shape[0]
+	ranks = np.empty( n, dtype=int )
+	if n == 0:
+		return ranks
+
+	D = ComputeDominationMatrix( objectives )
+	domination_counts = D.sum( axis=0 )
+
+	rank_counter = 0
+	current_front = np.flatnonzero( domination_counts == 0 )
+	while len(current_front) > 0:
+		ranks[current_front] = rank_counter
+		domination_counts[current_front] = -1
+		domination_counts -= D[current_front].sum( axis=0 )
+		current_front = np.flatnonzero( domination_counts == 0 )
+		rank_counter += 1
+
+	return ranks
+
+
+def _ComputeRanksTwoObjectiveSweep( objectives ):
+	# Visit the points in lexicographic order of (obj1, obj2): every dominator of a point is visited before it.
+	# Within a front, the last point visited has the smallest obj2, and it dominates the current point
+	# iff its (obj2, obj1) is lexicographically smaller. These tails are sorted across fronts, so the
+	# front of each point is found by binary search.
+	n = objectives.shape[0]
+	ranks = np.empty( n, dtype=int )
+	order = np.lexsort( (objectives[:,1], objectives[:,0]) )
+	obj1 = objectives[:,0].tolist()
+	obj2 = objectives[:,1].tolist()
+
+	front_tails = []
+	for i in order.tolist():
+		key = (obj2[i], obj1[i])
+		k = bisect_left( front_tails, key )
+		if k == len(front_tails):
+			front_tails.append( key )
+		else:
+			front_tails[k] = key
+		ranks[i] = k
+
+	return ranks
+
+
+def _ComputeRanksIncremental( objectives ):
+	# in lexicographic order, no point dominates those inserted before it, so no point moves
+	archive = ParetoArchive()
+	for i in np.lexsort( (objectives[:,1], objectives[:,0]) ).tolist():
+		archive.Insert( i, objectives[i] )
+	return np.array( [archive.GetRank(i) for i in range(objectives.shape[0])], dtype=int )
+
+
+def _GroupRanksIntoFronts( ranks ):
+	if len(ranks) == 0:
+		return []
+	order = np.argsort( ranks, kind='stable' )
+	boundaries = np.flatnonzero( np.diff( ranks[order] ) ) + 1
+	return np.split( order, boundaries )
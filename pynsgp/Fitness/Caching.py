@@ -0,0 +1,83 @@
+from collections import OrderedDict
+
+
+class LRUCache:
+	# Bounded least-recently-used cache. Every entry has a size given by size_function (1 by default);
+	# least recently used entries are evicted until the total size fits within max_size.
+
+	def __init__( self, max_size, size_function=None ):
+		self.max_size = max_size
+		self.size_function = size_function if size_function else (lambda value: 1)
+		self.size = 0
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self._entries = OrderedDict()
+
+	def __len__( self ):
+		return len(self._entries)
+
+	def __contains__( self, key ):
+		return key in self._entries
+
+	def Get( self, key ):
+		entry = self._entries.get( key )
+		if entry is None:
+			self.misses += 1
+			return None
+		self.hits += 1
+		self._entries.move_to_end( key )
+		return entry[0]
+
+	def Put( self, key, value ):
+		value_size = self.size_function( value )
+		if value_size > self.max_size:
+			return
+		if key in self._entries:
+			self.size -= self._entries.pop( key )[1]
+		while self.size + value_size > self.max_size:
+			_, (_, evicted_size) = self._entries.popitem( last=False )
+			self.size -= evicted_size
+			self.evictions += 1
+		self._entries[key] = (value, value_size)
+		self.size += value_size
+
+	def GetStatistics( self ):
+		return { 'entries': len(self._entries), 'size': self.size,
+			'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions }
+
+
+class SubtreeOutputCache(LRUCache):
+	# Maps the structural hash of a subtree to its output on a fixed X, within a budget of max_bytes.
+	# Only the nodes whose subtree is not in the cache are computed, so offspring that share most of their
+	# structure with their parents are evaluated along the changed paths only.
+
+	def __init__( self, max_bytes ):
+		super(SubtreeOutputCache,self).__init__( max_bytes, size_function=lambda output: output.nbytes )
+
+	def GetOutput( self, individual, X ):
+		hashes = {}
+		individual._GetStructuralHashRecursive( hashes )
+		return self._GetOutputRecursive( individual, X, hashes )
+
+	def _GetOutputRecursive( self, node, X, hashes ):
+		if node.arity == 0:
+			# leaves are cheaper to recompute than to store
+			return node.GetOutput( X )
+
+		key = hashes[id(node)]
+		output = self.Get( key )
+		if output is not None:
+			return output
+
+		args = [ self._GetOutputRecursive( c, X, hashes ) for c in node._children ]
+		try:
+			output = node._GetOutputSpecificNode( args, X )
+		except NotImplementedError:
+			# custom nodes that only implement GetOutput are evaluated as a whole
+			output = node.GetOutput( X )
+
+		# cached outputs are shared among trees and must never be modified in place
+		output.flags.writeable = False
+		self.Put( key, output )
+		return output
@@ -0,0 +1,156 @@
+import numpy as np
+
+from pynsgp.Nodes.SymbolicRegressionNodes import AddNode, SubNode, MulNode, DivNode, AnalyticQuotientNode, PowNode, ExpNode, LogNode, SinNode, CosNode, EphemeralRandomConstantNode
+
+
+# partial derivatives of the output of a node with respect to each of its inputs, as functions of the
+# inputs and of the output; they follow the protected definitions of _GetOutputSpecificNode
+def _DivPartials( args, output ):
+	sign_X1 = np.sign(args[1])
+	sign_X1[sign_X1==0]=1
+	denominator = 1e-6 + np.abs(args[1])
+	return [ sign_X1 / denominator, -args[0] / np.square(denominator) ]
+
+def _AnalyticQuotientPartials( args, output ):
+	squared_norm = 1 + np.square(args[1])
+	return [ 1 / np.sqrt(squared_norm), -args[0] * args[1] / np.power(squared_norm, 1.5) ]
+
+_PARTIALS = {
+	AddNode: lambda args, output: [ 1.0, 1.0 ],
+	SubNode: lambda args, output: [ 1.0, -1.0 ],
+	MulNode: lambda args, output: [ args[1], args[0] ],
+	DivNode: _DivPartials,
+	AnalyticQuotientNode: _AnalyticQuotientPartials,
+	PowNode: lambda args, output: [ args[1] * np.power(args[0], args[1] - 1), output * np.log(args[0]) ],
+	ExpNode: lambda args, output: [ output ],
+	LogNode: lambda args, output: [ np.sign(args[0]) / ( np.abs(args[0]) + 1e-6 ) ],
+	SinNode: lambda args, output: [ np.cos(args[0]) ],
+	CosNode: lambda args, output: [ -np.sin(args[0]) ],
+}
+
+
+def GetConstantNodes( individual ):
+	return [ n for n in individual.GetSubtree() if isinstance(n, EphemeralRandomConstantNode) ]
+
+
+def GetOutputAndJacobian( individual, X, constant_nodes ):
+	# output of individual and its derivatives with respect to the values of constant_nodes, as a matrix
+	# with one row per row of X and one column per constant, computed in one forward pass over the tree
+	columns = { id(n): i for i, n in enumerate(constant_nodes) }
+	output, jacobian = _GetOutputAndJacobianRecursive( individual, X, columns )
+	if jacobian is None:
+		jacobian = np.zeros( (X.shape[0], len(constant_nodes)) )
+	return output, jacobian
+
+
+def _GetOutputAndJacobianRecursive( node, X, columns ):
+	# the Jacobian of a subtree without constants is None
+	results = [ _GetOutputAndJacobianRecursive( c, X, columns ) for c in node._children ]
+	args = [ r[0] for r in results ]
+	try:
+		output = node._GetOutputSpecificNode( args, X )
+	except NotImplementedError:
+		# custom nodes that only implement GetOutput are evaluated as a whole, and have no derivatives
+		output = node.GetOutput( X )
+
+	if id(node) in columns:
+		jacobian = np.zeros( (X.shape[0], len(columns)) )
+		jacobian[:, columns[id(node)]] = 1.0
+		return output, jacobian
+
+	if all( [r[1] is None for r in results] ):
+		return output, None
+
+	partials = None
+	for cls in type(node).__mro__:
+		if cls in _PARTIALS:
+			partials = _PARTIALS[cls]( args, output )
+			break
+	if partials is None:
+		raise ValueError('No derivatives for node type '+type(node).__name__)
+
+	jacobian = 0.0
+	for partial, r in zip( partials, results ):
+		if r[1] is not None:
+			jacobian = jacobian + np.reshape( partial, (-1, 1) ) * r[1]
+	return output, jacobian
+
+
+def _ComputeScaledError( output, y, use_linear_scaling ):
+	# mean squared error of a + b*output, with the least-squares a and b if use_linear_scaling
+	a = 0.0
+	b = 1.0
+	if use_linear_scaling:
+		centered_output = output - np.mean(output)
+		var_output = np.dot( centered_output, centered_output )
+		b = np.dot( centered_output, y ) / var_output if var_output > 0 else 0.0
+		a = np.mean(y) - b*np.mean(output)
+	residual = y - (a + b*output)
+	return np.dot( residual, residual ) / len(y), a, b
+
+
+def OptimizeConstants( individual, X, y, use_linear_scaling=True, max_iterations=10, max_evaluations=10 ):
+	# tunes all constants of individual jointly and in place, by Levenberg-Marquardt on the mean squared error
+	# (after linear scaling, whose coefficients take part in every step); every computation of the output
+	# counts as an evaluation. Returns the output with the best constants, or None if no step improved on
+	# the initial ones, and the number of evaluations
+	constant_nodes = GetConstantNodes( individual )
+	if len(constant_nodes) == 0 or max_evaluations <= 0:
+		return None, 0
+	y = np.asarray( y, dtype=float )
+	constants = np.array( [n.GetValue() for n in constant_nodes], dtype=float )
+
+	with np.errstate( all='ignore' ):
+		try:
+			output, jacobian = GetOutputAndJacobian( individual, X, constant_nodes )
+		except (ValueError, NotImplementedError):
+			# node types without derivatives
+			return None, 0
+		evaluations = 1
+		if not np.all( np.isfinite(output) ) or not np.all( np.isfinite(jacobian) ):
+			return None, evaluations
+		error, a, b = _ComputeScaledError( output, y, use_linear_scaling )
+		best_output = None
+
+		damping = 1e-3
+		iterations = 0
+		while iterations < max_iterations and evaluations < max_evaluations:
+			iterations += 1
+			# derivatives of the prediction a + b*output with respect to (a, b, constants) or to the constants
+			if use_linear_scaling:
+				derivatives = np.column_stack( (np.ones(len(y)), output, b*jacobian) )
+			else:
+				derivatives = jacobian
+			residual = y - (a + b*output)
+			hessian = np.dot( derivatives.T, derivatives )
+			gradient = np.dot( derivatives.T, residual )
+			try:
+				step = np.linalg.solve( hessian + damping * np.diag( np.diag(hessian) + 1e-12 ), gradient )
+			except np.linalg.LinAlgError:
+				damping *= 10
+				continue
+
+			candidate = constants + step[-len(constants):]
+			for n, c in zip( constant_nodes, candidate.tolist() ):
+				n.c = c
+			candidate_output, candidate_jacobian = GetOutputAndJacobian( individual, X, constant_nodes )
+			evaluations += 1
+			candidate_error, candidate_a, candidate_b = _ComputeScaledError( candidate_output, y, use_linear_scaling )
+
+			if np.isfinite( candidate_error ) and candidate_error < error and np.all( np.isfinite(candidate_jacobian) ):
+				converged = error - candidate_error <= 1e-10 * error
+				constants, output, jacobian = candidate, candidate_output, candidate_jacobian
+				error, a, b = candidate_error, candidate_a, candidate_b
+				best_output = output
+				damping /= 10
+				if converged:
+					break
+			else:
+				damping *= 10
+				if damping > 1e10:
+					# no step improves any more
+					break
+
+	for n, c in zip( constant_nodes, constants.tolist() ):
+		n.c = c
+	return best_output, evaluations
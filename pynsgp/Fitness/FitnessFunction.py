@@ -1,20 +1,99 @@
 import numpy as np
+import queue
+from hashlib import blake2b
 from copy import deepcopy
 
+from pynsgp.Nodes.SymbolicRegressionNodes import EphemeralRandomConstantNode
+from pynsgp.Nodes.CompiledTree import Compile, StackMachine
+from pynsgp.Fitness.Caching import LRUCache, SubtreeOutputCache
+from pynsgp.Fitness.Streaming import ChunkedDataset, RunningMoments
+from pynsgp.Fitness import ConstantOptimization
+from pynsgp.Fitness.ParallelEvaluation import PARALLEL_BACKENDS, ProcessPoolEvaluator, ThreadPoolEvaluator, TensorEvaluator, SharedNodeEvaluator
+
+
+EVALUATION_MODES = ('full', 'random_subsample', 'stratified_subsample', 'racing')
+
+
 class SymbolicRegressionFitness:
 
-	def __init__( self, X_train, y_train, use_linear_scaling=True, use_interpretability_model=False ):
+	def __init__( self, X_train, y_train, use_linear_scaling=True, use_interpretability_model=False, use_compiled_evaluation=False,
+		subtree_cache_bytes=0, fitness_memo_size=0, duplicate_fingerprint_rows=None, chunk_size=None,
+		evaluation_mode='full', subsample_size=1000 ):
 		self.X_train = X_train
 		self.y_train = y_train
-		self.y_train_var = np.var(y_train)
+		# X_train can be a ChunkedDataset, or chunk_size can be set, to evaluate blocks of rows at a time
+		self.training_chunks = None
+		if isinstance( X_train, ChunkedDataset ):
+			self.training_chunks = X_train
+		elif chunk_size is not None:
+			self.training_chunks = ChunkedDataset( X_train, y_train, chunk_size=chunk_size )
+		if self.training_chunks is not None:
+			# y_train is None for data that comes from a chunk iterator factory, so the rows are counted here
+			moments = self.training_chunks.GetTargetMoments()
+			self.y_train_var = moments.M2_y / moments.n
+			self.n_training_rows = moments.n
+		else:
+			self.y_train_var = np.var(y_train)
+			self.n_training_rows = len(y_train)
+			# statistics of the target used by every evaluation
+			self.y_train_mean = np.mean(y_train)
+			self.y_train_centered = np.asarray( y_train - self.y_train_mean, dtype=float )
 		self.use_linear_scaling = use_linear_scaling
 		self.use_interpretability_model = use_interpretability_model
+		self.use_compiled_evaluation = use_compiled_evaluation
+		self.stack_machine = StackMachine()
+		self.subtree_cache = SubtreeOutputCache( subtree_cache_bytes ) if subtree_cache_bytes > 0 else None
+		# memo of the evaluation results of up to fitness_memo_size trees, keyed by structural hash
+		self.fitness_memo = LRUCache( fitness_memo_size ) if fitness_memo_size > 0 else None
+		# duplicates are detected on evenly spaced rows if duplicate_fingerprint_rows is set, on all rows otherwise
+		self.duplicate_fingerprint_rows = duplicate_fingerprint_rows
+		self.fingerprint_rows = None
+		if self.training_chunks is None and duplicate_fingerprint_rows is not None and duplicate_fingerprint_rows < len(y_train):
+			self.fingerprint_rows = np.unique( np.linspace( 0, len(y_train) - 1, duplicate_fingerprint_rows ).astype(int) )
+		# with evaluation_mode != 'full', offspring are scored on subsample_size rows that change every generation
+		# ('random_subsample', 'stratified_subsample' by target value), or on growing row prefixes that start
+		# at subsample_size rows and stop once they are dominated by the population ('racing')
+		if evaluation_mode not in EVALUATION_MODES:
+			raise ValueError('Unrecognized evaluation mode '+str(evaluation_mode))
+		if evaluation_mode != 'full' and self.training_chunks is not None:
+			raise ValueError('Evaluation mode '+evaluation_mode+' cannot be used with streamed training data')
+		self.evaluation_mode = evaluation_mode
+		self.subsample_size = subsample_size
+		if evaluation_mode == 'stratified_subsample':
+			self._rows_by_target = np.argsort( y_train, kind='stable' )
+		elif evaluation_mode == 'racing':
+			# prefixes of a fixed random order of the rows, so that they are representative of the whole set
+			self._racing_order = np.random.permutation( len(y_train) )
+			self._racing_y = np.asarray( y_train[self._racing_order], dtype=float )
+			self._racing_reference = ( np.zeros(0), np.zeros(0) )
+		if evaluation_mode in ('random_subsample', 'stratified_subsample'):
+			self.ResampleRows()
 		self.elite = None
 		self.evaluations = 0
+		self.rows_evaluated = 0
+		self.cache_hits = 0
+		self._worker_pool = None
+		# evaluations started by StartEvaluation that are finished, as (individual, key, result, error)
+		self._finished_evaluations = None
 
 
 
 	def Evaluate( self, individual ):
+		if self.evaluation_mode == 'racing':
+			self._EvaluateRacing( individual )
+		elif self.evaluation_mode != 'full':
+			self._EvaluateOnSubsample( individual )
+		else:
+			self._EvaluateOnAllRows( individual )
+
+
+	def _EvaluateOnAllRows( self, individual ):
+		key = None
+		if self.fitness_memo is not None:
+			key = individual.GetStructuralHash()
+			if self._LoadFromMemo( individual, key ):
+				return
+
 		self.evaluations = self.evaluations + 1
 		individual.objectives = []
 
@@ -22,44 +101,461 @@ class SymbolicRegressionFitness:
 		# set in scale with the rest
 		# obj1 /= self.y_train_var * 100 
 		individual.objectives.append( obj1 )
+		individual.evaluated_on_all_rows = True
+		self.rows_evaluated = self.rows_evaluated + self.n_training_rows
 
-		if self.use_interpretability_model:
-			obj2 = self.EvaluatePHIsModel(individual)
+		self._CompleteEvaluation( individual, key )
+
+
+	def EvaluateOnAllRows( self, individuals ):
+		# completes the evaluation of the individuals that were scored on part of the rows, e.g., the front
+		for individual in individuals:
+			if not individual.evaluated_on_all_rows:
+				self._EvaluateOnAllRows( individual )
+
+
+	def PrepareGeneration( self, population ):
+		# called before the offspring of a generation are evaluated
+		if self.evaluation_mode in ('random_subsample', 'stratified_subsample'):
+			# the population is scored again on the new rows, so that it compares fairly with the offspring
+			self.ResampleRows()
+			for individual in population:
+				self._EvaluateOnSubsample( individual )
+		elif self.evaluation_mode == 'racing':
+			# smallest error among the individuals evaluated on all rows that are at most as complex as each other
+			reference = [ p.objectives for p in population if p.evaluated_on_all_rows ]
+			reference = sorted( reference, key=lambda objectives: objectives[1] )
+			complexities = np.array( [ objectives[1] for objectives in reference ] )
+			min_errors = np.minimum.accumulate( [ objectives[0] for objectives in reference ] ) if len(reference) > 0 else np.zeros(0)
+			self._racing_reference = ( complexities, min_errors )
+
+
+	def ResampleRows( self ):
+		n = len(self.y_train)
+		size = min( self.subsample_size, n )
+		if self.evaluation_mode == 'stratified_subsample':
+			# one row from each of size strata of rows with similar target values
+			boundaries = np.linspace( 0, n, size + 1 ).astype(int)
+			picks = boundaries[:-1] + ( np.random.random(size) * (boundaries[1:] - boundaries[:-1]) ).astype(int)
+			rows = np.sort( self._rows_by_target[picks] )
 		else:
-			obj2 = self.EvaluateNumberOfNodes(individual)	
-		individual.objectives.append( obj2 )
+			rows = np.sort( np.random.choice( n, size, replace=False ) )
+		self.subsample_X = self.X_train[rows]
+		self.subsample_target = self._GetTargetStatistics( self.y_train[rows] )
+
+
+	def _GetTargetStatistics( self, y ):
+		y = np.asarray( y, dtype=float )
+		y_mean = np.mean( y )
+		y_centered = y - y_mean
+		return ( y, y_mean, y_centered, np.dot( y_centered, y_centered ) / len(y) )
+
 
-		if not self.elite or individual.objectives[0] < self.elite.objectives[0]:
-			del self.elite
-			self.elite = deepcopy(individual)
+	def _EvaluateOnSubsample( self, individual ):
+		self.evaluations = self.evaluations + 1
+		self.rows_evaluated = self.rows_evaluated + self.subsample_X.shape[0]
+		output = self.GetOutput( individual, self.subsample_X )
+		result = self.ComputeError( output, target=self.subsample_target )
+		self._SetErrorResult( individual, result )
+		individual.objectives = [ result[0] ]
+		individual.evaluated_on_all_rows = False
+		self._CompleteEvaluation( individual, update_elite=False )
+
+
+	def _EvaluateRacing( self, individual ):
+		# the error on all rows is at least the smallest error over the rows seen so far (times their share of
+		# the rows), whatever the linear scaling; the race stops when that bound shows that the individual is
+		# dominated by a population member evaluated on all rows
+		complexities, min_errors = self._racing_reference
+		idx = np.searchsorted( complexities, self._ComputeComplexity( individual ), side='right' ) - 1
+		if idx < 0:
+			# nothing can dominate it
+			self._EvaluateOnAllRows( individual )
+			return
+		threshold = min_errors[idx]
+
+		key = None
+		if self.fitness_memo is not None:
+			key = individual.GetStructuralHash()
+			if self._LoadFromMemo( individual, key ):
+				return
+
+		self.evaluations = self.evaluations + 1
+		n = len(self.y_train)
+		moments = RunningMoments()
+		output = np.empty( n )
+		start = 0
+		end = min( self.subsample_size, n )
+		while end < n:
+			rows = self._racing_order[start:end]
+			output[rows] = self.GetOutput( individual, self.X_train[rows] )
+			moments.Update( output[rows], self._racing_y[start:end] )
+			start = end
+			end = min( 2*end, n )
 
+			lower_bound = self._ComputeErrorLowerBound( moments, n )
+			if lower_bound > threshold:
+				self.rows_evaluated = self.rows_evaluated + start
+				a, b = moments.GetLinearScaling() if self.use_linear_scaling else (0.0, 1.0)
+				fingerprint = self.ComputeOutputFingerprint( a + b*output[self._racing_order[:start]], subsampled=True )
+				self._SetErrorResult( individual, (lower_bound, a, b, fingerprint) )
+				individual.objectives = [ lower_bound ]
+				individual.evaluated_on_all_rows = False
+				self._CompleteEvaluation( individual, update_elite=False )
+				return
+
+		# the race was not decided early: complete the output with the remaining rows
+		rows = self._racing_order[start:]
+		output[rows] = self.GetOutput( individual, self.X_train[rows] )
+		result = self.ComputeError( output )
+		self._SetErrorResult( individual, result )
+		individual.objectives = [ result[0] ]
+		individual.evaluated_on_all_rows = True
+		self.rows_evaluated = self.rows_evaluated + n
+		self._CompleteEvaluation( individual, key )
+
+
+	def _ComputeErrorLowerBound( self, moments, n ):
+		if not np.isfinite( moments.mean_output ):
+			# NaN or infinite outputs have an infinite error
+			return np.inf
+		if self.use_linear_scaling:
+			# residual of the least-squares fit on the rows seen so far
+			squared_errors = moments.M2_y
+			if moments.M2_output > 0:
+				squared_errors -= moments.C_output_y * moments.C_output_y / moments.M2_output
+		else:
+			squared_errors = moments.GetMeanSquaredError( 0.0, 1.0 ) * moments.n
+		if np.isnan( squared_errors ):
+			# the sums overflowed, so nothing is known
+			return 0.0
+		# slightly loosened, against rounding errors
+		return max( squared_errors, 0.0 ) / n * (1 - 1e-9)
+
+
+	def OptimizeConstants( self, individual, max_evaluations, max_iterations=10 ):
+		# tunes the constants of the evaluated individual in place, see ConstantOptimization.OptimizeConstants,
+		# and evaluates it again if its error decreased, which is returned; the computations of the output
+		# count as evaluations
+		if self.training_chunks is not None or self.evaluation_mode != 'full':
+			raise ValueError('Constant optimization needs evaluation_mode=\'full\' and training data in memory')
+		output, evaluations = ConstantOptimization.OptimizeConstants( individual, self.X_train, self.y_train,
+			use_linear_scaling=self.use_linear_scaling, max_iterations=max_iterations, max_evaluations=max_evaluations )
+		self.evaluations = self.evaluations + evaluations
+		self.rows_evaluated = self.rows_evaluated + evaluations * self.n_training_rows
+		if output is None:
+			return False
+
+		result = self.ComputeError( output )
+		self._SetErrorResult( individual, result )
+		individual.objectives = [ result[0] ]
+		individual.evaluated_on_all_rows = True
+		key = individual.GetStructuralHash() if self.fitness_memo is not None else None
+		self._CompleteEvaluation( individual, key )
+		return True
+
+
+	def EvaluateBatch( self, individuals, n_jobs=1, backend='process' ):
+		# evaluates all individuals, spreading the error computations over n_jobs workers (-1 for all cores):
+		# processes ('process'), threads that take one tree each ('thread'), or threads that share the rows
+		# of every tree ('thread_rows'); or in this thread, all at once as one vectorized program ('tensor') or
+		# computing the nodes shared by several trees only once ('dag')
+		if backend not in PARALLEL_BACKENDS:
+			raise ValueError('Unrecognized parallel backend '+str(backend))
+		if (n_jobs == 1 and backend not in ('tensor', 'dag')) or self.training_chunks is not None or self.evaluation_mode != 'full':
+			# streamed data and subsets of rows are evaluated in the calling thread
+			for individual in individuals:
+				self.Evaluate( individual )
+			return
+
+		to_evaluate = []
+		keys = []
+		seen_keys = set()
+		duplicates = []
+		for individual in individuals:
+			key = None
+			if self.fitness_memo is not None:
+				key = individual.GetStructuralHash()
+				if self._LoadFromMemo( individual, key ):
+					continue
+				if key in seen_keys:
+					# identical to another tree of this batch, filled in once that one is evaluated
+					duplicates.append( (individual, key) )
+					continue
+				seen_keys.add( key )
+			to_evaluate.append( individual )
+			keys.append( key )
+
+		# constants are drawn here rather than in the workers, so that they stay with the trees
+		if backend in ('tensor', 'dag'):
+			payloads = to_evaluate
+		else:
+			payloads = [ self._GetWorkerPayload( individual ) for individual in to_evaluate ]
+		results = self._GetWorkerPool( n_jobs, backend ).Map( payloads )
+
+		for individual, key, result in zip( to_evaluate, keys, results ):
+			self._CompleteWorkerEvaluation( individual, key, result )
+
+		for individual, key in duplicates:
+			if not self._LoadFromMemo( individual, key ):
+				self.Evaluate( individual )
+
+
+	def StartEvaluation( self, individual, n_jobs=-1, backend='process' ):
+		# starts the evaluation of individual by one of n_jobs workers ('process' or 'thread' backend), which
+		# WaitForEvaluation completes; returns False if individual is evaluated already instead, as happens
+		# with n_jobs=1, streamed data, subsets of rows, and fitness memo hits
+		if n_jobs == 1 or self.training_chunks is not None or self.evaluation_mode != 'full':
+			self.Evaluate( individual )
+			return False
+		if backend not in ('process', 'thread'):
+			raise ValueError('Asynchronous evaluation needs the process or thread backend, not '+str(backend))
+
+		key = None
+		if self.fitness_memo is not None:
+			key = individual.GetStructuralHash()
+			if self._LoadFromMemo( individual, key ):
+				return False
+
+		if self._finished_evaluations is None:
+			self._finished_evaluations = queue.Queue()
+		finished = self._finished_evaluations
+		self._GetWorkerPool( n_jobs, backend ).Submit( self._GetWorkerPayload( individual ),
+			lambda result: finished.put( (individual, key, result, None) ),
+			lambda error: finished.put( (individual, key, None, error) ) )
+		return True
+
+
+	def WaitForEvaluation( self ):
+		# waits until one of the evaluations started by StartEvaluation finishes, and returns its individual
+		individual, key, result, error = self._finished_evaluations.get()
+		if error is not None:
+			raise error
+		self._CompleteWorkerEvaluation( individual, key, result )
+		return individual
+
+
+	def _CompleteWorkerEvaluation( self, individual, key, result ):
+		self.evaluations = self.evaluations + 1
+		self._SetErrorResult( individual, result )
+		individual.objectives = [ result[0] ]
+		individual.evaluated_on_all_rows = True
+		self.rows_evaluated = self.rows_evaluated + self.n_training_rows
+		self._CompleteEvaluation( individual, key )
+
+
+	def ReleaseWorkers(self):
+		if self._worker_pool is not None:
+			self._worker_pool[1].Close()
+			self._worker_pool = None
+		self._finished_evaluations = None
+
+
+	def _GetWorkerPool(self, n_jobs, backend):
+		if self._worker_pool is not None and self._worker_pool[0] != (n_jobs, backend):
+			self.ReleaseWorkers()
+		if self._worker_pool is None:
+			if backend == 'process':
+				pool = ProcessPoolEvaluator( self.X_train, self.y_train, n_jobs,
+					use_linear_scaling=self.use_linear_scaling, duplicate_fingerprint_rows=self.duplicate_fingerprint_rows )
+			elif backend == 'tensor':
+				pool = TensorEvaluator( self )
+			elif backend == 'dag':
+				pool = SharedNodeEvaluator( self )
+			else:
+				pool = ThreadPoolEvaluator( self, n_jobs, split_rows=(backend == 'thread_rows') )
+			self._worker_pool = ( (n_jobs, backend), pool )
+		return self._worker_pool[1]
+
+
+	def _GetWorkerPayload(self, individual):
+		try:
+			return Compile( individual )
+		except ValueError:
+			for n in individual.GetSubtree():
+				if isinstance(n, EphemeralRandomConstantNode):
+					n.GetValue()
+			return individual
+
+
+	def _CompleteEvaluation(self, individual, key=None, update_elite=True):
+		individual.objectives.append( self._ComputeComplexity(individual) )
+
+		if update_elite and (not self.elite or individual.objectives[0] < self.elite.objectives[0]):
+			if self.evaluation_mode in ('random_subsample', 'stratified_subsample'):
+				# the population is scored again on other rows later on
+				self.elite = deepcopy(individual)
+			else:
+				# individuals are not modified after being evaluated, so the elite needs no copy
+				self.elite = individual
+
+		if key is not None:
+			self.fitness_memo.Put( key, (list(individual.objectives), individual.ls_a, individual.ls_b, individual.cached_output) )
+
+
+	def _LoadFromMemo(self, individual, key):
+		memo = self.fitness_memo.Get( key )
+		if memo is None:
+			return False
+		# an identical tree was evaluated before, so it cannot improve on the elite
+		self.cache_hits = self.cache_hits + 1
+		objectives, individual.ls_a, individual.ls_b, individual.cached_output = memo
+		individual.objectives = list(objectives)
+		individual.evaluated_on_all_rows = True
+		return True
+
+
+	def _ComputeComplexity(self, individual):
+		if self.use_interpretability_model:
+			return self.EvaluatePHIsModel(individual)
+		return self.EvaluateNumberOfNodes(individual)
+
+
+
+	def GetOutput(self, individual, X):
+		if self.subtree_cache is not None and X is self.X_train:
+			return self.subtree_cache.GetOutput( individual, X )
+		if self.use_compiled_evaluation:
+			try:
+				program = Compile( individual )
+			except ValueError:
+				# trees with node types unknown to the compiler are evaluated recursively
+				return individual.GetOutput( X )
+			return self.stack_machine.GetOutput( program, X )
+		return individual.GetOutput( X )
 
 
 	def EvaluateMeanSquaredError(self, individual):
-		output = individual.GetOutput( self.X_train )
+		if self.training_chunks is not None:
+			result = self._ComputeErrorStreaming( individual )
+		else:
+			output = self.GetOutput( individual, self.X_train )
+			result = self.ComputeError( output )
+		self._SetErrorResult( individual, result )
+		return result[0]
+
+
+	def _ComputeErrorStreaming(self, individual):
+		# one pass over the blocks of rows: peak memory is bounded by the block size, not by the dataset size
+		moments = RunningMoments()
+		fingerprint_output = None
+		for X_block, y_block in self.training_chunks:
+			output = self.GetOutput( individual, X_block )
+			if fingerprint_output is None:
+				# duplicates are detected on the first rows
+				n_fingerprint_rows = self.duplicate_fingerprint_rows if self.duplicate_fingerprint_rows is not None else len(y_block)
+				fingerprint_output = np.array( output[:n_fingerprint_rows], dtype=float )
+			moments.Update( output, y_block )
+
+		a = 0.0
+		b = 1.0
+		if self.use_linear_scaling:
+			a, b = moments.GetLinearScaling()
+
+		fingerprint = self.ComputeOutputFingerprint( a + b*fingerprint_output )
+
+		fit_error = moments.GetMeanSquaredError( a, b )
+		if np.isnan(fit_error):
+			fit_error = np.inf
+
+		return fit_error, a, b, fingerprint
+
 
+	def ComputeError(self, output, target=None):
+		# returns the error, the linear scaling coefficients and the fingerprint of the scaled output;
+		# target holds y, its mean, its centered values and its variance, by default those of the training set
+		if target is None:
+			y, y_mean, y_centered, y_var = self.y_train, self.y_train_mean, self.y_train_centered, self.y_train_var
+		else:
+			y, y_mean, y_centered, y_var = target
 		a = 0.0
 		b = 1.0
 
 		if self.use_linear_scaling:
-			b = np.cov(self.y_train, output)[0,1] / (np.var(output) + 1e-10)
-			a = np.mean(self.y_train) - b*np.mean(output)
-			individual.ls_a = a
-			individual.ls_b = b
+			# closed form from the sums of output, output^2 and output*(y - mean(y)), without full-length temporaries
+			n = len(output)
+			mean_output = np.sum( output ) / n
+			cov_output_y = np.dot( output, y_centered ) / n
+			var_output = np.dot( output, output ) / n - mean_output * mean_output
 
-		scaled_output = a + b*output
-		individual.cached_output = ','.join([str(np.round(oi,6)) for oi in scaled_output])
+			if not np.isfinite( var_output ) or not np.isfinite( cov_output_y ) or var_output < 1e-6 * mean_output * mean_output:
+				# the sums overflow for huge outputs, and cancel out for (nearly) constant ones: use two passes
+				b = np.cov(y, output)[0,1] / (np.var(output) + 1e-10)
+				a = y_mean - b*np.mean(output)
+				fit_error = np.mean( np.square( y - (a + b*output) ) )
+			else:
+				# same estimator as np.cov(y, output)[0,1] / (np.var(output) + 1e-10)
+				b = cov_output_y * n / (n - 1) / (var_output + 1e-10)
+				a = y_mean - b*mean_output
+				# the residual has zero mean, so the error is its variance
+				fit_error = max( y_var - 2*b*cov_output_y + b*b*var_output, 0.0 )
+		else:
+			residual = y - output
+			fit_error = np.dot( residual, residual ) / len(residual)
 
-		fit_error = np.mean( np.square( self.y_train - scaled_output ) )
+		if self.fingerprint_rows is not None and target is None:
+			fingerprint = self.ComputeOutputFingerprint( a + b*output[self.fingerprint_rows], subsampled=True )
+		else:
+			fingerprint = self.ComputeOutputFingerprint( a + b*output, subsampled=target is not None )
 
 		if np.isnan(fit_error):
 			fit_error = np.inf
 		
-		return fit_error
+		return fit_error, a, b, fingerprint
+
+
+	def ComputeErrors(self, outputs):
+		# ComputeError for each row of the (number of trees, n rows) outputs, with vectorized reductions
+		n = outputs.shape[1]
+		if self.use_linear_scaling:
+			mean_outputs = np.sum( outputs, axis=1 ) / n
+			cov_outputs_y = np.dot( outputs, self.y_train_centered ) / n
+			var_outputs = np.einsum( 'ij,ij->i', outputs, outputs ) / n - mean_outputs * mean_outputs
+			with np.errstate( invalid='ignore', over='ignore' ):
+				b = cov_outputs_y * n / (n - 1) / (var_outputs + 1e-10)
+				a = self.y_train_mean - b*mean_outputs
+				fit_errors = np.maximum( self.y_train_var - 2*b*cov_outputs_y + b*b*var_outputs, 0.0 )
+				# rows with overflowing or cancelling sums are computed with two passes, as in ComputeError
+				two_pass = np.flatnonzero( ~np.isfinite( var_outputs ) | ~np.isfinite( cov_outputs_y ) | (var_outputs < 1e-6 * mean_outputs * mean_outputs) )
+				if len(two_pass) > 0:
+					centered_outputs = outputs[two_pass] - np.mean( outputs[two_pass], axis=1 )[:, None]
+					b[two_pass] = ( np.dot( centered_outputs, self.y_train_centered ) / (n - 1) ) / ( np.mean( np.square(centered_outputs), axis=1 ) + 1e-10 )
+					a[two_pass] = self.y_train_mean - b[two_pass] * np.mean( outputs[two_pass], axis=1 )
+					fit_errors[two_pass] = np.mean( np.square( self.y_train - (a[two_pass, None] + b[two_pass, None] * outputs[two_pass]) ), axis=1 )
+		else:
+			residuals = self.y_train - outputs
+			fit_errors = np.einsum( 'ij,ij->i', residuals, residuals ) / n
+			a = np.zeros( len(outputs) )
+			b = np.ones( len(outputs) )
+
+		fingerprint_outputs = outputs[:, self.fingerprint_rows] if self.fingerprint_rows is not None else outputs
+		with np.errstate( invalid='ignore', over='ignore' ):
+			rounded = np.round( a[:, None] + b[:, None]*fingerprint_outputs, 6 )
+		rounded[ np.isnan(rounded) ] = np.nan
+
+		fit_errors[ np.isnan(fit_errors) ] = np.inf
+		return [ ( fit_errors[i], a[i], b[i], blake2b( rounded[i].tobytes(), digest_size=16 ).digest() ) for i in range( len(outputs) ) ]
+
+
+	def _SetErrorResult(self, individual, result):
+		if self.use_linear_scaling:
+			individual.ls_a = result[1]
+			individual.ls_b = result[2]
+		individual.cached_output = result[3]
+
+
+	def ComputeOutputFingerprint(self, output, subsampled=False):
+		# fixed-size digest of the output rounded to 6 decimals, used to spot duplicates
+		if self.fingerprint_rows is not None and not subsampled:
+			output = output[self.fingerprint_rows]
+		rounded = np.round( output, 6 )
+		# all NaNs must hash alike
+		rounded[ np.isnan(rounded) ] = np.nan
+		return blake2b( rounded.tobytes(), digest_size=16 ).digest()
 
 
 	def EvaluateNumberOfNodes(self, individual):
-		result = len(individual.GetSubtree())
+		result = individual.GetSize()
 		return result
 
 
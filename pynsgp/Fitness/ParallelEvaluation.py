@@ -0,0 +1,226 @@
+import os
+import threading
+import numpy as np
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from concurrent.futures import ThreadPoolExecutor
+
+from pynsgp.Nodes.CompiledTree import StackMachine, BatchedProgram
+
+
+PARALLEL_BACKENDS = ('process', 'thread', 'thread_rows', 'tensor', 'dag')
+
+
+# state of each worker process, set up once by _InitializeWorker
+_worker_fitness = None
+_worker_shared_memory = []
+
+
+def _AttachSharedArray( spec ):
+	name, shape, dtype = spec
+	shared_memory = SharedMemory( name=name )
+	_worker_shared_memory.append( shared_memory )
+	return np.ndarray( shape, dtype=dtype, buffer=shared_memory.buf )
+
+
+def _InitializeWorker( X_spec, y_spec, fitness_settings ):
+	global _worker_fitness
+	from pynsgp.Fitness.FitnessFunction import SymbolicRegressionFitness
+	X = _AttachSharedArray( X_spec )
+	y = _AttachSharedArray( y_spec )
+	_worker_fitness = SymbolicRegressionFitness( X, y, **fitness_settings )
+
+
+def _EvaluateInWorker( payload ):
+	# payload is a compiled tree or, for node types the compiler does not know, the tree itself
+	X = _worker_fitness.X_train
+	if hasattr( payload, 'opcodes' ):
+		output = _worker_fitness.stack_machine.GetOutput( payload, X, copy=False )
+	else:
+		output = payload.GetOutput( X )
+	return _worker_fitness.ComputeError( output )
+
+
+class ProcessPoolEvaluator:
+	# Pool of worker processes that compute the error of trees on the training set. The training set is
+	# placed in shared memory once, so it is neither pickled per task nor copied per worker.
+
+	def __init__( self, X_train, y_train, n_jobs, **fitness_settings ):
+		self.n_jobs = n_jobs if n_jobs > 0 else os.cpu_count()
+		self._shared_memory = []
+		X_spec = self._ShareArray( X_train )
+		y_spec = self._ShareArray( y_train )
+		self._pool = get_context().Pool( self.n_jobs, initializer=_InitializeWorker,
+			initargs=(X_spec, y_spec, fitness_settings) )
+
+	def _ShareArray( self, array ):
+		array = np.ascontiguousarray( array )
+		shared_memory = SharedMemory( create=True, size=max(array.nbytes, 1) )
+		self._shared_memory.append( shared_memory )
+		shared_array = np.ndarray( array.shape, dtype=array.dtype, buffer=shared_memory.buf )
+		shared_array[...] = array
+		return (shared_memory.name, array.shape, array.dtype.str)
+
+	def Map( self, payloads ):
+		if len(payloads) == 0:
+			return []
+		chunksize = max( 1, len(payloads) // (4 * self.n_jobs) )
+		return self._pool.map( _EvaluateInWorker, payloads, chunksize=chunksize )
+
+	def Submit( self, payload, callback, error_callback ):
+		# evaluates payload asynchronously; one of the callbacks is called with the result or the exception
+		self._pool.apply_async( _EvaluateInWorker, (payload,), callback=callback, error_callback=error_callback )
+
+	def Close( self ):
+		self._pool.close()
+		self._pool.join()
+		for shared_memory in self._shared_memory:
+			shared_memory.close()
+			shared_memory.unlink()
+		self._shared_memory = []
+
+
+class ThreadPoolEvaluator:
+	# Pool of threads that compute the error of trees on the training set of fitness_function. The NumPy
+	# kernels release the GIL on large arrays, so threads run in parallel without copying any data.
+	# With split_rows=False every thread evaluates whole trees; with split_rows=True the rows of the
+	# training set are split in n_jobs blocks and the threads evaluate one tree at a time together.
+
+	def __init__( self, fitness_function, n_jobs, split_rows=False ):
+		self.n_jobs = n_jobs if n_jobs > 0 else os.cpu_count()
+		self.fitness_function = fitness_function
+		self.split_rows = split_rows
+		self._thread_state = threading.local()
+		self._executor = ThreadPoolExecutor( max_workers=self.n_jobs )
+		n_rows = fitness_function.X_train.shape[0]
+		boundaries = np.linspace( 0, n_rows, self.n_jobs + 1 ).astype(int)
+		self._row_blocks = [ (start, end) for start, end in zip(boundaries[:-1], boundaries[1:]) if end > start ]
+
+	def _GetStackMachine( self ):
+		# stack machines hold their buffers, so every thread needs its own
+		if not hasattr( self._thread_state, 'stack_machine' ):
+			self._thread_state.stack_machine = StackMachine()
+		return self._thread_state.stack_machine
+
+	def _GetOutput( self, payload, X ):
+		if hasattr( payload, 'opcodes' ):
+			return self._GetStackMachine().GetOutput( payload, X, copy=False )
+		return payload.GetOutput( X )
+
+	def _Evaluate( self, payload ):
+		return self.fitness_function.ComputeError( self._GetOutput( payload, self.fitness_function.X_train ) )
+
+	def _EvaluateRowBlock( self, payload, output, start, end ):
+		output[start:end] = self._GetOutput( payload, self.fitness_function.X_train[start:end] )
+
+	def _EvaluateSplittingRows( self, payload ):
+		output = np.empty( self.fitness_function.X_train.shape[0] )
+		futures = [ self._executor.submit( self._EvaluateRowBlock, payload, output, start, end ) for start, end in self._row_blocks ]
+		for future in futures:
+			future.result()
+		return self.fitness_function.ComputeError( output )
+
+	def Map( self, payloads ):
+		if self.split_rows:
+			return [ self._EvaluateSplittingRows( payload ) for payload in payloads ]
+		return list( self._executor.map( self._Evaluate, payloads ) )
+
+	def Submit( self, payload, callback, error_callback ):
+		# evaluates payload asynchronously; one of the callbacks is called with the result or the exception
+		future = self._executor.submit( self._Evaluate, payload )
+		future.add_done_callback( lambda f: error_callback( f.exception() ) if f.exception() is not None else callback( f.result() ) )
+
+	def Close( self ):
+		self._executor.shutdown()
+
+
+class TensorEvaluator:
+	# Computes the errors of a whole batch of trees in the calling thread: the trees are merged in batched
+	# programs, whose outputs are reduced to errors by vectorized operations. Batches are split so that the
+	# values of all nodes of a batched program take at most max_block_bytes, small enough to stay in cache.
+	# Map takes the trees themselves rather than compiled ones, as the batched programs are built in one pass.
+
+	def __init__( self, fitness_function, max_block_bytes=2**23 ):
+		self.fitness_function = fitness_function
+		self.max_block_bytes = max_block_bytes
+
+	def Map( self, trees ):
+		X = self.fitness_function.X_train
+		results = [ None ] * len(trees)
+		max_nodes = max( 1, self.max_block_bytes // (8 * X.shape[0]) )
+		program = BatchedProgram()
+		block = []
+		for i, tree in enumerate( trees ):
+			if not program.AddTree( tree ):
+				# trees with node types unknown to the compiler are evaluated one by one
+				results[i] = self.fitness_function.ComputeError( tree.GetOutput( X ) )
+				continue
+			block.append( i )
+			if program.n_nodes >= max_nodes:
+				self._EvaluateBlock( program, block, results )
+				program = BatchedProgram()
+				block = []
+		if len(block) > 0:
+			self._EvaluateBlock( program, block, results )
+		return results
+
+	def _EvaluateBlock( self, program, block, results ):
+		outputs = program.GetOutputs( self.fitness_function.X_train )
+		for i, result in zip( block, self.fitness_function.ComputeErrors( outputs ) ):
+			results[i] = result
+
+	def Close( self ):
+		pass
+
+
+class SharedNodeEvaluator:
+	# Computes the errors of a batch of trees in the calling thread, computing the output of every node object
+	# once however many trees of the batch share it, as they do after copy-on-write variation and, even more,
+	# with a SubtreeStore. Outputs are dropped as soon as all the nodes that use them are computed.
+
+	def __init__( self, fitness_function ):
+		self.fitness_function = fitness_function
+
+	def Map( self, trees ):
+		X = self.fitness_function.X_train
+		uses = {}
+		for tree in trees:
+			self._CountUses( tree, uses )
+		outputs = {}
+		results = []
+		for tree in trees:
+			results.append( self.fitness_function.ComputeError( self._GetOutput( tree, X, uses, outputs ) ) )
+			self._Use( tree, uses, outputs )
+		return results
+
+	def _CountUses( self, node, uses ):
+		# number of times the output of every node is needed: once per parent node or tree that refers to it
+		if id(node) in uses:
+			uses[id(node)] += 1
+			return
+		uses[id(node)] = 1
+		for c in node._children:
+			self._CountUses( c, uses )
+
+	def _GetOutput( self, node, X, uses, outputs ):
+		output = outputs.get( id(node) )
+		if output is not None:
+			return output
+		args = [ self._GetOutput( c, X, uses, outputs ) for c in node._children ]
+		try:
+			output = node._GetOutputSpecificNode( args, X )
+		except NotImplementedError:
+			# custom nodes that only implement GetOutput are evaluated as a whole
+			output = node.GetOutput( X )
+		for c in node._children:
+			self._Use( c, uses, outputs )
+		outputs[id(node)] = output
+		return output
+
+	def _Use( self, node, uses, outputs ):
+		uses[id(node)] -= 1
+		if uses[id(node)] == 0:
+			del outputs[id(node)]
+
+	def Close( self ):
+		pass
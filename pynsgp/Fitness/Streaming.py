@@ -0,0 +1,80 @@
+import numpy as np
+
+
+class ChunkedDataset:
+	# Training data that is read one block of rows at a time. It is either a pair of arrays, such as
+	# numpy.memmap, sliced into blocks of chunk_size rows, or a function that returns a new iterator
+	# over (X_block, y_block) pairs every time it is called.
+
+	def __init__( self, X=None, y=None, chunk_size=10000, chunk_iterator_factory=None ):
+		if chunk_iterator_factory is None and (X is None or y is None):
+			raise ValueError('Either X and y, or chunk_iterator_factory must be given')
+		self.X = X
+		self.y = y
+		self.chunk_size = chunk_size
+		self.chunk_iterator_factory = chunk_iterator_factory
+
+	def __iter__( self ):
+		if self.chunk_iterator_factory is not None:
+			return iter( self.chunk_iterator_factory() )
+		return self._IterateArrays()
+
+	def _IterateArrays( self ):
+		for start in range( 0, self.X.shape[0], self.chunk_size ):
+			yield np.asarray( self.X[start:start+self.chunk_size] ), np.asarray( self.y[start:start+self.chunk_size] )
+
+	def GetTargetMoments( self ):
+		# RunningMoments of the target, which also count the rows
+		moments = RunningMoments()
+		for _, y_block in self:
+			moments.Update( y_block, y_block )
+		return moments
+
+
+class RunningMoments:
+	# Count, means, and centered (co-)moments of an output and the target, merged block by block with the
+	# pairwise update of Chan et al., which stays accurate when the blocks are many.
+
+	def __init__( self ):
+		self.n = 0
+		self.mean_output = 0.0
+		self.mean_y = 0.0
+		self.M2_output = 0.0
+		self.M2_y = 0.0
+		self.C_output_y = 0.0
+
+	def Update( self, output, y ):
+		n_block = len(y)
+		if n_block == 0:
+			return
+		mean_output = np.mean( output )
+		mean_y = np.mean( y )
+		centered_output = output - mean_output
+		centered_y = y - mean_y
+		M2_output = np.dot( centered_output, centered_output )
+		M2_y = np.dot( centered_y, centered_y )
+		C_output_y = np.dot( centered_output, centered_y )
+
+		n = self.n + n_block
+		delta_output = mean_output - self.mean_output
+		delta_y = mean_y - self.mean_y
+		weight = self.n * n_block / n
+
+		self.mean_output += delta_output * n_block / n
+		self.mean_y += delta_y * n_block / n
+		self.M2_output += M2_output + delta_output * delta_output * weight
+		self.M2_y += M2_y + delta_y * delta_y * weight
+		self.C_output_y += C_output_y + delta_output * delta_y * weight
+		self.n = n
+
+	def GetLinearScaling( self ):
+		# same estimator as np.cov(y, output)[0,1] / (np.var(output) + 1e-10)
+		b = ( self.C_output_y / (self.n - 1) ) / ( self.M2_output / self.n + 1e-10 )
+		a = self.mean_y - b * self.mean_output
+		return a, b
+
+	def GetMeanSquaredError( self, a, b ):
+		# mean of (y - a - b*output)^2, as the variance of the residual plus its squared mean
+		mean_residual = self.mean_y - a - b * self.mean_output
+		variance_residual = ( self.M2_y + b * b * self.M2_output - 2 * b * self.C_output_y ) / self.n
+		return max( variance_residual, 0.0 ) + mean_residual * mean_residual
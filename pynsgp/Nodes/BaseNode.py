@@ -1,18 +1,79 @@
 import numpy as np
+from hashlib import blake2b
 
 
-class Node:	# Base class with general functionalities
+class IndividualRecord:	# metadata of a tree that is an individual of the population
+
+	__slots__ = ('objectives', 'rank', 'crowding_distance', 'ls_a', 'ls_b', 'cached_output', 'evaluated_on_all_rows')
 
 	def __init__(self):
 		self.objectives = []
-		self.parent = None
-		self.arity = 0	# arity is the number of expected inputs
 		self.rank = 0
 		self.crowding_distance = 0
-		self._children = []
 		self.ls_a = 0.0
 		self.ls_b = 1.0
-		self.is_not_arithmetic = False
+		self.cached_output = None
+		self.evaluated_on_all_rows = True
+
+	def Copy(self):
+		r = IndividualRecord()
+		for name in IndividualRecord.__slots__:
+			setattr( r, name, getattr(self, name) )
+		r.objectives = list(self.objectives)
+		return r
+
+
+def _IndividualProperty( name ):
+	# attribute of the individual record of a node, which is created at first use
+	return property( lambda self: getattr( self._GetRecord(), name ),
+		lambda self, value: setattr( self._GetRecord(), name, value ) )
+
+
+# names of the slots added by subclasses of Node, per class
+_subclass_slot_names = {}
+
+def _GetSubclassSlotNames( cls ):
+	names = _subclass_slot_names.get( cls )
+	if names is None:
+		names = []
+		for c in cls.__mro__:
+			if c is Node:
+				break
+			slots = c.__dict__.get( '__slots__', () )
+			names += [ slots ] if isinstance( slots, str ) else [ name for name in slots if name not in ('__dict__', '__weakref__') ]
+		_subclass_slot_names[cls] = names
+	return names
+
+
+class Node:	# Base class with general functionalities
+
+	# nodes have no __dict__: what is the same for all nodes of a class is a class attribute, and what
+	# only individuals (roots) need is in an IndividualRecord
+	__slots__ = ('parent', '_children', '_size', '_height', '_record')
+
+	arity = 0	# arity is the number of expected inputs
+	is_not_arithmetic = False
+
+	objectives = _IndividualProperty( 'objectives' )
+	rank = _IndividualProperty( 'rank' )
+	crowding_distance = _IndividualProperty( 'crowding_distance' )
+	ls_a = _IndividualProperty( 'ls_a' )
+	ls_b = _IndividualProperty( 'ls_b' )
+	cached_output = _IndividualProperty( 'cached_output' )
+	evaluated_on_all_rows = _IndividualProperty( 'evaluated_on_all_rows' )
+
+	def __init__(self):
+		self.parent = None
+		self._children = []
+		# number of nodes and height of the subtree, kept up to date by the methods that change the children
+		self._size = 1
+		self._height = 0
+		self._record = None
+
+	def _GetRecord(self):
+		if self._record is None:
+			self._record = IndividualRecord()
+		return self._record
 
 	def Dominates(self, other):
 		better_somewhere = False 
@@ -37,22 +98,91 @@ class Node:	# Base class with general functionalities
 	def AppendChild( self, N ):
 		self._children.append(N)
 		N.parent = self
+		self._UpdateSizeAndHeight()
+
+	def SetChildren( self, children ):
+		# replaces all children at once, e.g., while building a tree bottom-up
+		for c in self._children:
+			c.parent = None
+		self._children = list(children)
+		for c in self._children:
+			c.parent = self
+		self._UpdateSizeAndHeight()
+
+	def AppendSharedChild( self, N ):
+		# appends N without becoming its parent, as N may belong to several trees (copy-on-write)
+		self._children.append(N)
+		N.parent = None
+		self._UpdateSizeAndHeight()
 
 	def DetachChild( self, N ):
-		assert(N in self._children)
+		i = self.GetChildPosition( N )
+		self._children.pop(i)
+		N.parent = None
+		self._UpdateSizeAndHeight()
+		return i
+
+	def GetChildPosition( self, N ):
 		for i, c in enumerate(self._children):
-			if c == N:
-				self._children.pop(i)
-				N.parent = None
-				break
+			if c is N:
+				return i
+		raise ValueError('Node is not a child of this node')
+
+	def ReplaceChildAt( self, i, N ):
+		# puts N in the place of the i-th child, which is detached
+		self._children[i].parent = None
+		self._children[i] = N
+		N.parent = self
+		self._UpdateSizeAndHeight()
+
+	def ReplaceChild( self, old, N ):
+		i = self.GetChildPosition( old )
+		self.ReplaceChildAt( i, N )
 		return i
 
 	def InsertChildAtPosition( self, i, N ):
 		self._children.insert( i, N )
 		N.parent = self
+		self._UpdateSizeAndHeight()
+
+	def GetSize( self ):
+		return self._size
+
+	def _UpdateSizeAndHeight( self ):
+		# recomputes the cached values of this node and of its ancestors, along the path to the root;
+		# ancestors are left as they are as soon as a node keeps its size and height
+		n = self
+		while n:
+			size = 1 + sum( [c._size for c in n._children] )
+			height = 1 + max( [c._height for c in n._children] ) if len(n._children) > 0 else 0
+			if n is not self and size == n._size and height == n._height:
+				break
+			n._size = size
+			n._height = height
+			n = n.parent
+
+	def GetNodeAtPreorderIndex( self, index ):
+		# the node at position index of GetSubtree and the child positions that lead to it from this node;
+		# whole subtrees are skipped by their cached sizes, so the cost is proportional to the depth of the node
+		n = self
+		path = []
+		while index > 0:
+			index -= 1
+			for i, c in enumerate(n._children):
+				if index < c._size:
+					break
+				index -= c._size
+			path.append(i)
+			n = c
+		return n, path
 
 	def GetOutput( self, X ):
-		return None
+		args = [ c.GetOutput( X ) for c in self._children ]
+		return self._GetOutputSpecificNode( args, X )
+
+	def GetStructuralHash( self ):
+		# 128-bit digest that is equal for structurally identical subtrees (same node types, features and constants)
+		return self._GetStructuralHashRecursive( {} )
 
 	def GetDepth(self):
 		n = self
@@ -63,15 +193,62 @@ class Node:	# Base class with general functionalities
 		return d
 
 	def GetHeight(self):
-		subtree = self.GetSubtree()
-		curr_depth = self.GetDepth()
-		leaves = [x for x in subtree if x.arity == 0]
-		max_h = 0
-		for l in leaves:
-			d = l.GetDepth()
-			if d > max_h:
-				max_h = d
-		return max_h - curr_depth
+		return self._height
+
+	def Clone( self ):
+		# copy of this node alone: no parent and no children
+		cls = self.__class__
+		n = cls.__new__( cls )
+		for name in _GetSubclassSlotNames( cls ):
+			if hasattr( self, name ):
+				setattr( n, name, getattr(self, name) )
+		if hasattr( self, '__dict__' ):
+			# subclasses without __slots__
+			n.__dict__.update( self.__dict__ )
+		n.parent = None
+		n._children = []
+		n._size = 1
+		n._height = 0
+		n._record = self._record.Copy() if self._record is not None else None
+		return n
+
+	def GetFactory( self ):
+		# function that returns new nodes like Clone, without a record; the attributes of this
+		# node are read once here, so that creating each node costs little more than a constructor
+		cls = self.__class__
+		slot_values = [ (name, getattr(self, name)) for name in _GetSubclassSlotNames( cls ) if hasattr( self, name ) ]
+		attributes = dict( self.__dict__ ) if hasattr( self, '__dict__' ) else None
+		new = cls.__new__
+
+		def NewNode():
+			n = new( cls )
+			for name, value in slot_values:
+				setattr( n, name, value )
+			if attributes is not None:
+				n.__dict__.update( attributes )
+			n.parent = None
+			n._children = []
+			n._size = 1
+			n._height = 0
+			n._record = None
+			return n
+
+		return NewNode
+
+	def CopySubtree( self ):
+		# copy of the whole subtree that shares no node with it, even if the subtree shares nodes (copy-on-write)
+		n = self.Clone()
+		if len(self._children) > 0:
+			n.SetChildren( [ c.CopySubtree() for c in self._children ] )
+		return n
+
+	def ShallowCopy( self ):
+		# copy of this node whose children are shared with the original; the parent links of
+		# shared nodes are not maintained, as they may belong to several trees
+		n = self.Clone()
+		for c in self._children:
+			n.AppendSharedChild(c)
+		return n
 
 
 	def _GetSubtreeRecursive( self, result ):
@@ -94,6 +271,25 @@ class Node:	# Base class with general functionalities
 		raise NotImplementedError('_GetHumanExpressionSpecificNode is not implemented for base class BaseNode')
 
 
+	def _GetOutputSpecificNode( self, args, X ):
+		raise NotImplementedError('_GetOutputSpecificNode is not implemented for base class BaseNode')
+
+
+	def _GetStructuralHasher( self ):
+		# hash object of this node alone, to be updated with the digests of its children
+		return blake2b( ( type(self).__name__ + ':' + repr(self) ).encode(), digest_size=16 )
+
+
+	def _GetStructuralHashRecursive( self, hashes ):
+		# also stores the digest of every node of the subtree in hashes, keyed by id(node)
+		h = self._GetStructuralHasher()
+		for c in self._children:
+			h.update( c._GetStructuralHashRecursive( hashes ) )
+		digest = h.digest()
+		hashes[id(self)] = digest
+		return digest
+
+
 	def Count_n_nacomp(self, count=None):
 	    if count == None:
 	        count = 0
@@ -0,0 +1,289 @@
+import numpy as np
+
+from pynsgp.Nodes.SymbolicRegressionNodes import *
+
+
+# opcodes of the flat representation; ARITIES[opcode] is the arity of the operation
+OP_FEATURE = 0
+OP_CONSTANT = 1
+OP_ADD = 2
+OP_SUB = 3
+OP_MUL = 4
+OP_DIV = 5
+OP_AQ = 6
+OP_POW = 7
+OP_EXP = 8
+OP_LOG = 9
+OP_SIN = 10
+OP_COS = 11
+
+ARITIES = np.array( [0, 0, 2, 2, 2, 2, 2, 2, 1, 1, 1, 1], dtype=np.int8 )
+
+NODE_OPCODES = {
+	FeatureNode : OP_FEATURE,
+	EphemeralRandomConstantNode : OP_CONSTANT,
+	AddNode : OP_ADD,
+	SubNode : OP_SUB,
+	MulNode : OP_MUL,
+	DivNode : OP_DIV,
+	AnalyticQuotientNode : OP_AQ,
+	PowNode : OP_POW,
+	ExpNode : OP_EXP,
+	LogNode : OP_LOG,
+	SinNode : OP_SIN,
+	CosNode : OP_COS,
+}
+
+
+class CompiledTree:
+	# prefix-order encoding of a tree: one opcode per node, plus the feature index or constant of each leaf
+
+	def __init__( self, opcodes, arguments ):
+		self.opcodes = opcodes
+		self.arguments = arguments
+		self.max_stack = self._ComputeMaxStack()
+
+	def __len__( self ):
+		return len(self.opcodes)
+
+	def _ComputeMaxStack( self ):
+		# the evaluator visits the program backwards: leaves push one entry, operators pop arity and push one
+		stack_size = 0
+		max_stack = 0
+		for arity in ARITIES[ self.opcodes[::-1] ].tolist():
+			stack_size += 1 - arity
+			if stack_size > max_stack:
+				max_stack = stack_size
+		return max_stack
+
+
+def Compile( tree ):
+	opcodes = []
+	arguments = []
+	for n in tree.GetSubtree():
+		opcode = NODE_OPCODES.get( type(n) )
+		if opcode is None:
+			raise ValueError('Node of type '+type(n).__name__+' cannot be compiled')
+		opcodes.append( opcode )
+		if opcode == OP_FEATURE:
+			arguments.append( n.id )
+		elif opcode == OP_CONSTANT:
+			arguments.append( n.GetValue() )
+		else:
+			arguments.append( 0.0 )
+
+	return CompiledTree( np.array(opcodes, dtype=np.int8), np.array(arguments, dtype=float) )
+
+
+class StackMachine:
+	# Evaluates compiled trees over the rows of X. Every intermediate result lives in a preallocated
+	# (stack size, n rows) buffer that is reused across calls, so no temporary arrays are created per node.
+
+	def __init__( self ):
+		self._buffer = np.empty( (0, 0) )
+
+	def _GetBuffer( self, n_slots, n_rows ):
+		if self._buffer.shape[0] < n_slots or self._buffer.shape[1] != n_rows:
+			self._buffer = np.empty( (max(n_slots, self._buffer.shape[0]), n_rows) )
+		return self._buffer
+
+	def GetOutput( self, program, X, copy=True ):
+		# with copy=False the result is a view of the internal buffer, valid until the next call
+		# one slot more than the stack size is used as scratch space by some operators
+		S = self._GetBuffer( program.max_stack + 1, X.shape[0] )
+		sp = 0
+
+		opcodes = program.opcodes[::-1].tolist()
+		arguments = program.arguments[::-1].tolist()
+		for opcode, argument in zip( opcodes, arguments ):
+			if opcode == OP_FEATURE:
+				np.copyto( S[sp], X[:, int(argument)] )
+				sp += 1
+			elif opcode == OP_CONSTANT:
+				S[sp].fill( argument )
+				sp += 1
+			elif opcode >= OP_EXP:
+				X0 = S[sp-1]
+				if opcode == OP_EXP:
+					np.exp( X0, out=X0 )
+				elif opcode == OP_LOG:
+					np.abs( X0, out=X0 )
+					X0 += 1e-6
+					np.log( X0, out=X0 )
+				elif opcode == OP_SIN:
+					np.sin( X0, out=X0 )
+				else:
+					np.cos( X0, out=X0 )
+			else:
+				# the first child is on top of the stack, the result replaces the second child
+				X0 = S[sp-1]
+				X1 = S[sp-2]
+				if opcode == OP_ADD:
+					np.add( X0, X1, out=X1 )
+				elif opcode == OP_SUB:
+					np.subtract( X0, X1, out=X1 )
+				elif opcode == OP_MUL:
+					np.multiply( X0, X1, out=X1 )
+				elif opcode == OP_DIV:
+					negative = X1 < 0
+					denominator = S[sp]
+					np.abs( X1, out=denominator )
+					denominator += 1e-6
+					np.divide( X0, denominator, out=X1 )
+					np.negative( X1, out=X1, where=negative )
+				elif opcode == OP_AQ:
+					denominator = S[sp]
+					np.square( X1, out=denominator )
+					denominator += 1
+					np.sqrt( denominator, out=denominator )
+					np.divide( X0, denominator, out=X1 )
+				else:
+					np.power( X0, X1, out=X1 )
+				sp -= 1
+
+		if copy:
+			return S[0].copy()
+		return S[0]
+
+
+class BatchedProgram:
+	# Several trees merged in one program. Nodes are grouped by the height of their subtree and by opcode,
+	# and every group is computed by one operation over the (group size, n rows) block of its children, so
+	# the number of NumPy calls depends on the operators and heights, not on the number of trees.
+
+	def __init__( self ):
+		self.n_nodes = 0
+		self.n_trees = 0
+		self._feature_nodes = []
+		self._feature_ids = []
+		self._constant_nodes = []
+		self._constant_values = []
+		# (height, opcode) -> nodes, first children, second children
+		self._groups = {}
+		self._roots = []
+		self._layout = None
+
+	def AddTree( self, tree ):
+		# returns False, leaving the program as it was, if tree has node types that cannot be compiled
+		n_nodes = self.n_nodes
+		try:
+			root, _ = self._AddSubtree( tree )
+		except ValueError:
+			self._RemoveNodesFrom( n_nodes )
+			return False
+		self._roots.append( root )
+		self.n_trees += 1
+		self._layout = None
+		return True
+
+	def _AddSubtree( self, node ):
+		# returns the index of node, given after those of its children, and the height of its subtree
+		opcode = NODE_OPCODES.get( type(node) )
+		if opcode is None:
+			raise ValueError('Node of type '+type(node).__name__+' cannot be compiled')
+		if opcode == OP_FEATURE:
+			self._feature_nodes.append( self.n_nodes )
+			self._feature_ids.append( node.id )
+			height = 0
+		elif opcode == OP_CONSTANT:
+			self._constant_nodes.append( self.n_nodes )
+			self._constant_values.append( node.GetValue() )
+			height = 0
+		else:
+			first, height = self._AddSubtree( node._children[0] )
+			second = -1
+			if len(node._children) == 2:
+				second, second_height = self._AddSubtree( node._children[1] )
+				if second_height > height:
+					height = second_height
+			height += 1
+			group = self._groups.get( (height, opcode) )
+			if group is None:
+				group = self._groups[(height, opcode)] = ([], [], [])
+			group[0].append( self.n_nodes )
+			group[1].append( first )
+			group[2].append( second )
+		self.n_nodes += 1
+		return self.n_nodes - 1, height
+
+	def _RemoveNodesFrom( self, n_nodes ):
+		# nodes are appended in increasing index order, so the nodes of a partially added tree are at the end
+		for indices, others in [ (self._feature_nodes, [self._feature_ids]), (self._constant_nodes, [self._constant_values]) ]:
+			while len(indices) > 0 and indices[-1] >= n_nodes:
+				indices.pop()
+				for values in others:
+					values.pop()
+		for key in list( self._groups ):
+			nodes, first, second = self._groups[key]
+			while len(nodes) > 0 and nodes[-1] >= n_nodes:
+				nodes.pop()
+				first.pop()
+				second.pop()
+			if len(nodes) == 0:
+				del self._groups[key]
+		self.n_nodes = n_nodes
+
+	def _GetLayout( self ):
+		# nodes are renumbered so that the leaves come first and every group fills a contiguous block of rows
+		if self._layout is None:
+			sorted_groups = [ (opcode, self._groups[(height, opcode)]) for (height, opcode) in sorted( self._groups ) ]
+			order = self._feature_nodes + self._constant_nodes
+			for _, (nodes, _, _) in sorted_groups:
+				order += nodes
+			new_ids = np.empty( self.n_nodes + 1, dtype=np.intp )
+			new_ids[ order ] = np.arange( self.n_nodes )
+			new_ids[-1] = -1
+
+			groups = []
+			start = len(self._feature_nodes) + len(self._constant_nodes)
+			for opcode, (nodes, first, second) in sorted_groups:
+				groups.append( (opcode, start, start + len(nodes), new_ids[first],
+					new_ids[second] if ARITIES[opcode] == 2 else None) )
+				start += len(nodes)
+			self._layout = ( np.array( self._feature_ids, dtype=np.intp ), np.array( self._constant_values, dtype=float ),
+				groups, new_ids[ self._roots ] )
+		return self._layout
+
+	def GetOutputs( self, X ):
+		# returns the (number of trees, n rows) outputs, computed with the same operations as the nodes
+		feature_ids, constant_values, groups, roots = self._GetLayout()
+		V = np.empty( (self.n_nodes, X.shape[0]) )
+		V[:len(feature_ids)] = X.T[feature_ids]
+		V[len(feature_ids):len(feature_ids)+len(constant_values)] = constant_values[:, None]
+
+		for opcode, start, end, first, second in groups:
+			X0 = V[first]
+			out = V[start:end]
+			if opcode == OP_EXP:
+				np.exp( X0, out=out )
+			elif opcode == OP_LOG:
+				np.abs( X0, out=X0 )
+				X0 += 1e-6
+				np.log( X0, out=out )
+			elif opcode == OP_SIN:
+				np.sin( X0, out=out )
+			elif opcode == OP_COS:
+				np.cos( X0, out=out )
+			else:
+				X1 = V[second]
+				if opcode == OP_ADD:
+					np.add( X0, X1, out=out )
+				elif opcode == OP_SUB:
+					np.subtract( X0, X1, out=out )
+				elif opcode == OP_MUL:
+					np.multiply( X0, X1, out=out )
+				elif opcode == OP_DIV:
+					negative = X1 < 0
+					np.abs( X1, out=X1 )
+					X1 += 1e-6
+					np.divide( X0, X1, out=out )
+					np.negative( out, out=out, where=negative )
+				elif opcode == OP_AQ:
+					np.square( X1, out=X1 )
+					X1 += 1
+					np.sqrt( X1, out=X1 )
+					np.divide( X0, X1, out=out )
+				else:
+					np.power( X0, X1, out=out )
+
+		return V[roots]
@@ -0,0 +1,97 @@
+import numpy as np
+from numpy.random import randint
+
+
+class PrimitiveSet:
+	# The functions and terminals of a run, with everything that tree generation and mutation look up
+	# built once: a factory per node prototype, the combined terminal and function table, and the
+	# functions grouped by arity.
+
+	def __init__( self, functions, terminals ):
+		self.functions = list( functions )
+		self.terminals = list( terminals )
+		self.function_factories = [ f.GetFactory() for f in self.functions ]
+		self.terminal_factories = [ t.GetFactory() for t in self.terminals ]
+		self.terminal_and_function_factories = self.terminal_factories + self.function_factories
+		self.function_factories_by_arity = {}
+		for f, factory in zip( self.functions, self.function_factories ):
+			self.function_factories_by_arity.setdefault( f.arity, [] ).append( factory )
+
+	def HasPrimitives( self, functions, terminals ):
+		# whether this set was built from these very node objects
+		return len(functions) == len(self.functions) and len(terminals) == len(self.terminals) \
+			and all( [a is b for a, b in zip(functions, self.functions)] ) and all( [a is b for a, b in zip(terminals, self.terminals)] )
+
+	def NewTerminal( self ):
+		return self.terminal_factories[ randint( len(self.terminal_factories) ) ]()
+
+	def NewFunctionOfArity( self, arity ):
+		# a random node that can take the place of a node of the given arity
+		if arity == 0:
+			return self.NewTerminal()
+		factories = self.function_factories_by_arity[arity]
+		return factories[ randint( len(factories) ) ]()
+
+	def GenerateRandomTree( self, max_height, curr_height=0, method='grow', min_depth=2 ):
+		if curr_height == max_height:
+			return self.NewTerminal()
+		if method == 'grow' and curr_height >= min_depth:
+			factories = self.terminal_and_function_factories
+		elif method == 'full' or (method == 'grow' and curr_height < min_depth):
+			factories = self.function_factories
+		else:
+			raise ValueError('Unrecognized tree generation method')
+
+		n = factories[ randint( len(factories) ) ]()
+		for i in range(n.arity):
+			n.AppendChild( self.GenerateRandomTree( max_height, curr_height=curr_height + 1, method=method, min_depth=min_depth ) )
+		return n
+
+	def GenerateRampedHalfAndHalf( self, how_many, min_depth, max_height ):
+		# the maximum height goes from min_depth to max_height in equally sized groups, and each tree is
+		# generated with the 'grow' or the 'full' method with equal probability; the random choices of all
+		# trees are drawn in blocks, rather than with one call to the random number generator per node
+		uniforms = _UniformBuffer()
+		trees = []
+		curr_max_depth = min_depth
+		init_depth_interval = how_many / (max_height - min_depth + 1)
+		next_depth_interval = init_depth_interval
+
+		for i in range( how_many ):
+			if i >= next_depth_interval:
+				next_depth_interval += init_depth_interval
+				curr_max_depth += 1
+
+			grow = uniforms.Next() < 0.5
+			trees.append( self._GenerateTreeFromUniforms( uniforms, curr_max_depth, 0, grow, min_depth ) )
+
+		return trees
+
+	def _GenerateTreeFromUniforms( self, uniforms, max_height, curr_height, grow, min_depth ):
+		if curr_height == max_height:
+			factories = self.terminal_factories
+		elif grow and curr_height >= min_depth:
+			factories = self.terminal_and_function_factories
+		else:
+			factories = self.function_factories
+
+		n = factories[ int( uniforms.Next() * len(factories) ) ]()
+		if n.arity > 0:
+			n.SetChildren( [ self._GenerateTreeFromUniforms( uniforms, max_height, curr_height + 1, grow, min_depth ) for i in range(n.arity) ] )
+		return n
+
+
+class _UniformBuffer:
+	# uniform random numbers in [0, 1), drawn from numpy.random block_size at a time
+
+	def __init__( self, block_size=4096 ):
+		self.block_size = block_size
+		self.values = []
+		self.position = 0
+
+	def Next( self ):
+		if self.position == len(self.values):
+			self.values = np.random.random( self.block_size ).tolist()
+			self.position = 0
+		self.position += 1
+		return self.values[self.position - 1]
@@ -0,0 +1,144 @@
+import numpy as np
+
+from pynsgp.Nodes.SymbolicRegressionNodes import *
+
+
+# identities of each operator, as functions of the values of the constant children (None for the others),
+# of the structural hashes of all children and of whether the outputs of the children are known to be
+# finite; they return ('child', i) if the node can be replaced by its i-th child, ('constant', value) if by
+# a constant, and None otherwise. Only identities that hold for the protected operators are used (e.g.,
+# not x / 1 or log(exp(x))), and those with a constant result only when the other operand is known to be
+# finite, as x * 0 is not 0 for an infinite x
+def _AddIdentities( values, digests, finite ):
+	if values[1] == 0:
+		return ('child', 0)
+	if values[0] == 0:
+		return ('child', 1)
+	return None
+
+def _SubIdentities( values, digests, finite ):
+	if values[1] == 0:
+		return ('child', 0)
+	if digests[0] == digests[1] and finite[0]:
+		return ('constant', 0.0)
+	return None
+
+def _MulIdentities( values, digests, finite ):
+	if values[1] == 1:
+		return ('child', 0)
+	if values[0] == 1:
+		return ('child', 1)
+	if (values[0] == 0 and finite[1]) or (values[1] == 0 and finite[0]):
+		return ('constant', 0.0)
+	return None
+
+def _DivIdentities( values, digests, finite ):
+	if values[0] == 0 and finite[1]:
+		return ('constant', 0.0)
+	return None
+
+def _AnalyticQuotientIdentities( values, digests, finite ):
+	if values[1] == 0:
+		return ('child', 0)
+	if values[0] == 0 and finite[1]:
+		return ('constant', 0.0)
+	return None
+
+def _PowIdentities( values, digests, finite ):
+	if values[1] == 1:
+		return ('child', 0)
+	if values[1] == 0:
+		return ('constant', 1.0)
+	return None
+
+IDENTITIES = {
+	AddNode : _AddIdentities,
+	SubNode : _SubIdentities,
+	MulNode : _MulIdentities,
+	DivNode : _DivIdentities,
+	AnalyticQuotientNode : _AnalyticQuotientIdentities,
+	PowNode : _PowIdentities,
+}
+
+# operators whose output is finite wherever their inputs are
+_BOUNDED = ( SinNode, CosNode, AnalyticQuotientNode )
+
+# input of the operators when folding constants, which only the terminals read
+_ONE_ROW = np.zeros( (1, 1) )
+
+
+def Simplify( tree, copy_on_write=False ):
+	# equivalent tree where the subtrees without features are folded into one constant and the identities
+	# above are applied, bottom-up; with copy_on_write, the nodes of tree are left as they are and the
+	# unchanged subtrees are shared, otherwise tree is simplified in place
+	simplified, _, is_new, _ = _SimplifyRecursive( tree, copy_on_write )
+	if simplified is not tree and not is_new:
+		# a subtree of tree becomes the root
+		if copy_on_write:
+			simplified = simplified.ShallowCopy()
+		else:
+			simplified.parent = None
+	return simplified
+
+
+def _NewConstant( value ):
+	n = EphemeralRandomConstantNode()
+	n.c = value
+	return n
+
+
+def _GetDigest( node, child_digests ):
+	# as in Node.GetStructuralHash
+	hasher = node._GetStructuralHasher()
+	for digest in child_digests:
+		hasher.update( digest )
+	return hasher.digest()
+
+
+def _SimplifyRecursive( node, copy_on_write ):
+	# returns the simplified subtree, its structural hash, whether its root is a new node, and whether its
+	# output is known to be finite
+	results = [ _SimplifyRecursive( c, copy_on_write ) for c in node._children ]
+	children = [ r[0] for r in results ]
+	digests = [ r[1] for r in results ]
+	finite = [ r[3] for r in results ]
+	values = [ c.GetValue() if type(c) is EphemeralRandomConstantNode else None for c in children ]
+
+	replacement = None
+	if len(children) > 0 and all( [v is not None for v in values] ):
+		try:
+			with np.errstate( all='ignore' ):
+				value = node._GetOutputSpecificNode( [ np.array([v]) for v in values ], _ONE_ROW )[0]
+		except NotImplementedError:
+			# custom nodes that only implement GetOutput are not folded
+			value = np.nan
+		if np.isfinite( value ):
+			replacement = ('constant', float(value))
+	elif type(node) in IDENTITIES:
+		replacement = IDENTITIES[type(node)]( values, digests, finite )
+
+	if replacement is not None and replacement[0] == 'child':
+		return results[ replacement[1] ]
+	if replacement is not None:
+		n = _NewConstant( replacement[1] )
+		return n, _GetDigest( n, [] ), True, True
+
+	if len(children) == 0:
+		is_finite = type(node) is FeatureNode or (type(node) is EphemeralRandomConstantNode and np.isfinite( node.GetValue() ))
+	else:
+		is_finite = type(node) in _BOUNDED and all( finite )
+
+	if all( [c is old for c, old in zip( children, node._children )] ):
+		return node, _GetDigest( node, digests ), False, is_finite
+
+	if copy_on_write:
+		n = node.Clone()
+		for r in results:
+			if r[2]:
+				n.AppendChild( r[0] )
+			else:
+				n.AppendSharedChild( r[0] )
+		return n, _GetDigest( n, digests ), True, is_finite
+
+	node.SetChildren( children )
+	return node, _GetDigest( node, digests ), False, is_finite
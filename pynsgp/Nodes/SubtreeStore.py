@@ -0,0 +1,66 @@
+class SubtreeStore:
+	# Hash-consing of the subtrees of a population: structurally identical subtrees are stored as one node,
+	# shared by all individuals that contain them. Every stored subtree counts the references to it, from the
+	# nodes above it and from the roots of the individuals, and is dropped when the count reaches zero.
+	# The roots are never shared, as they carry the objectives of their individual; stored nodes must not
+	# be modified, so trees are only changed by copy-on-write variation.
+
+	def __init__( self ):
+		self._nodes = {}
+		self._counts = {}
+		# structural hash of every stored node, keyed by id(node)
+		self._hashes = {}
+
+	def __len__( self ):
+		return len(self._nodes)
+
+	def Intern( self, tree ):
+		# returns a new root equal to tree, whose subtrees are the stored ones
+		root = tree.Clone()
+		for c in tree._children:
+			root.AppendSharedChild( self._InternSubtree( c ) )
+		return root
+
+	def Release( self, tree ):
+		# to be called when an individual returned by Intern is discarded
+		for c in tree._children:
+			self._ReleaseSubtree( c )
+
+	def _InternSubtree( self, node ):
+		h = self._hashes.get( id(node) )
+		if h is not None and self._nodes.get( h ) is node:
+			# already stored, e.g., shared with a parent by copy-on-write variation
+			self._counts[h] += 1
+			return node
+
+		children = [ self._InternSubtree( c ) for c in node._children ]
+		hasher = node._GetStructuralHasher()
+		for c in children:
+			hasher.update( self._hashes[id(c)] )
+		h = hasher.digest()
+
+		stored = self._nodes.get( h )
+		if stored is not None:
+			self._counts[h] += 1
+			# the children were counted for a node that is not stored after all
+			for c in children:
+				self._ReleaseSubtree( c )
+			return stored
+
+		n = node.Clone()
+		for c in children:
+			n.AppendSharedChild( c )
+		self._nodes[h] = n
+		self._counts[h] = 1
+		self._hashes[id(n)] = h
+		return n
+
+	def _ReleaseSubtree( self, node ):
+		h = self._hashes[id(node)]
+		self._counts[h] -= 1
+		if self._counts[h] == 0:
+			del self._counts[h]
+			del self._nodes[h]
+			del self._hashes[id(node)]
+			for c in node._children:
+				self._ReleaseSubtree( c )
@@ -3,10 +3,8 @@ import numpy as np
 from pynsgp.Nodes.BaseNode import Node
 
 class AddNode(Node):
-	
-	def __init__(self):
-		super(AddNode,self).__init__()
-		self.arity = 2
+	__slots__ = ()
+	arity = 2
 
 	def __repr__(self):
 		return '+'
@@ -14,15 +12,14 @@ class AddNode(Node):
 	def _GetHumanExpressionSpecificNode( self, args ):
 		return '( ' + args[0] + ' + ' + args[1] + ' )'
 
-	def GetOutput( self, X ):
-		X0 = self._children[0].GetOutput( X )
-		X1 = self._children[1].GetOutput( X )
+	def _GetOutputSpecificNode( self, args, X ):
+		X0 = args[0]
+		X1 = args[1]
 		return X0 + X1
 
 class SubNode(Node):
-	def __init__(self):
-		super(SubNode,self).__init__()
-		self.arity = 2
+	__slots__ = ()
+	arity = 2
 
 	def __repr__(self):
 		return '-'
@@ -30,15 +27,14 @@ class SubNode(Node):
 	def _GetHumanExpressionSpecificNode( self, args ):
 		return '( ' + args[0] + ' - ' + args[1] + ' )'
 
-	def GetOutput( self, X ):
-		X0 = self._children[0].GetOutput( X )
-		X1 = self._children[1].GetOutput( X )
+	def _GetOutputSpecificNode( self, args, X ):
+		X0 = args[0]
+		X1 = args[1]
 		return X0 - X1
 
 class MulNode(Node):
-	def __init__(self):
-		super(MulNode,self).__init__()
-		self.arity = 2
+	__slots__ = ()
+	arity = 2
 
 	def __repr__(self):
 		return '*'
@@ -46,15 +42,14 @@ class MulNode(Node):
 	def _GetHumanExpressionSpecificNode( self, args ):
 		return '( ' + args[0] + ' * ' + args[1] + ' )'
 
-	def GetOutput( self, X ):
-		X0 = self._children[0].GetOutput( X )
-		X1 = self._children[1].GetOutput( X )
+	def _GetOutputSpecificNode( self, args, X ):
+		X0 = args[0]
+		X1 = args[1]
 		return np.multiply(X0 , X1)
 	
 class DivNode(Node):
-	def __init__(self):
-		super(DivNode,self).__init__()
-		self.arity = 2
+	__slots__ = ()
+	arity = 2
 
 	def __repr__(self):
 		return '/'
@@ -62,18 +57,17 @@ class DivNode(Node):
 	def _GetHumanExpressionSpecificNode( self, args ):
 		return '( ' + args[0] + ' / ' + args[1] + ' )'
 
-	def GetOutput( self, X ):
-		X0 = self._children[0].GetOutput( X )
-		X1 = self._children[1].GetOutput( X )
+	def _GetOutputSpecificNode( self, args, X ):
+		X0 = args[0]
+		X1 = args[1]
 		sign_X1 = np.sign(X1)
 		sign_X1[sign_X1==0]=1
 		return np.multiply( sign_X1, X0) / ( 1e-6 + np.abs(X1) )
 
 class AnalyticQuotientNode(Node):
-	def __init__(self):
-		super(AnalyticQuotientNode,self).__init__()
-		self.arity = 2
-		self.is_not_arithmetic = True
+	__slots__ = ()
+	arity = 2
+	is_not_arithmetic = True
 
 	def __repr__(self):
 		return 'aq'
@@ -81,17 +75,15 @@ class AnalyticQuotientNode(Node):
 	def _GetHumanExpressionSpecificNode( self, args ):
 		return '( ' + args[0] + ' / sqrt( 1 + ' + args[1] + '**2 ) )'
 
-	def GetOutput( self, X ):
-		X0 = self._children[0].GetOutput( X )
-		X1 = self._children[1].GetOutput( X )
+	def _GetOutputSpecificNode( self, args, X ):
+		X0 = args[0]
+		X1 = args[1]
 		return X0 / np.sqrt( 1 + np.square(X1) )
 
 class PowNode(Node):
-
-	def __init__(self):
-		super(PowNode,self).__init__()
-		self.arity = 2
-		self.is_not_arithmetic = True
+	__slots__ = ()
+	arity = 2
+	is_not_arithmetic = True
 
 	def __repr__(self):
 		return '^'
@@ -99,17 +91,16 @@ class PowNode(Node):
 	def _GetHumanExpressionSpecificNode( self, args ):
 		return '( '+args[0]+'**( ' + args[0] + ' ))'
 
-	def GetOutput( self, X ):
-		X0 = self._children[0].GetOutput( X )
-		X1 = self._children[1].GetOutput( X )
+	def _GetOutputSpecificNode( self, args, X ):
+		X0 = args[0]
+		X1 = args[1]
 		return np.power(X0, X1)
 
 	
 class ExpNode(Node):
-	def __init__(self):
-		super(ExpNode,self).__init__()
-		self.arity = 1
-		self.is_not_arithmetic = True
+	__slots__ = ()
+	arity = 1
+	is_not_arithmetic = True
 
 	def __repr__(self):
 		return 'exp'
@@ -117,16 +108,15 @@ class ExpNode(Node):
 	def _GetHumanExpressionSpecificNode( self, args ):
 		return 'exp( ' + args[0] + ' )'
 
-	def GetOutput( self, X ):
-		X0 = self._children[0].GetOutput( X )
+	def _GetOutputSpecificNode( self, args, X ):
+		X0 = args[0]
 		return np.exp(X0)
 
 
 class LogNode(Node):
-	def __init__(self):
-		super(LogNode,self).__init__()
-		self.arity = 1
-		self.is_not_arithmetic = True
+	__slots__ = ()
+	arity = 1
+	is_not_arithmetic = True
 
 	def __repr__(self):
 		return 'log'
@@ -134,16 +124,15 @@ class LogNode(Node):
 	def _GetHumanExpressionSpecificNode( self, args ):
 		return 'log( ' + args[0] + ' )'
 
-	def GetOutput( self, X ):
-		X0 = self._children[0].GetOutput( X )
+	def _GetOutputSpecificNode( self, args, X ):
+		X0 = args[0]
 		return np.log( np.abs(X0) + 1e-6 )
 
 
 class SinNode(Node):
-	def __init__(self):
-		super(SinNode,self).__init__()
-		self.arity = 1
-		self.is_not_arithmetic = True
+	__slots__ = ()
+	arity = 1
+	is_not_arithmetic = True
 
 	def __repr__(self):
 		return 'sin'
@@ -151,15 +140,14 @@ class SinNode(Node):
 	def _GetHumanExpressionSpecificNode( self, args ):
 		return 'sin( ' + args[0] + ' )'
 
-	def GetOutput( self, X ):
-		X0 = self._children[0].GetOutput( X )
+	def _GetOutputSpecificNode( self, args, X ):
+		X0 = args[0]
 		return np.sin(X0)
 
 class CosNode(Node):
-	def __init__(self):
-		super(CosNode,self).__init__()
-		self.arity = 1
-		self.is_not_arithmetic = True
+	__slots__ = ()
+	arity = 1
+	is_not_arithmetic = True
 
 	def __repr__(self):
 		return 'cos'
@@ -167,12 +155,14 @@ class CosNode(Node):
 	def _GetHumanExpressionSpecificNode( self, args ):
 		return 'cos( ' + args[0] + ' )'
 
-	def GetOutput( self, X ):
-		X0 = self._children[0].GetOutput( X )
+	def _GetOutputSpecificNode( self, args, X ):
+		X0 = args[0]
 		return np.cos(X0)
 
 
 class FeatureNode(Node):
+	__slots__ = ('id',)
+
 	def __init__(self, id):
 		super(FeatureNode,self).__init__()
 		self.id = id
@@ -183,11 +173,13 @@ class FeatureNode(Node):
 	def _GetHumanExpressionSpecificNode( self, args ):
 		return 'x'+str(self.id)
 
-	def GetOutput(self, X):
+	def _GetOutputSpecificNode( self, args, X ):
 		return X[:,self.id]
 
 	
 class EphemeralRandomConstantNode(Node):
+	__slots__ = ('c',)
+
 	def __init__(self):
 		super(EphemeralRandomConstantNode,self).__init__()
 		self.c = np.nan
@@ -195,6 +187,11 @@ class EphemeralRandomConstantNode(Node):
 	def __Instantiate(self):
 		self.c = np.round( np.random.random() * 10 - 5, 3 )
 
+	def GetValue(self):
+		if np.isnan(self.c):
+			self.__Instantiate()
+		return self.c
+
 	def __repr__(self):
 		if np.isnan(self.c):
 			self.__Instantiate()
@@ -205,7 +202,7 @@ class EphemeralRandomConstantNode(Node):
 			self.__Instantiate()
 		return str(self.c)
 
-	def GetOutput(self,X):
+	def _GetOutputSpecificNode( self, args, X ):
 		if np.isnan(self.c):
 			self.__Instantiate()
 		return np.array([self.c] * X.shape[0])
@@ -7,6 +7,7 @@ from pynsgp.Nodes.BaseNode import Node
 from pynsgp.Nodes.SymbolicRegressionNodes import *
 from pynsgp.Fitness.FitnessFunction import SymbolicRegressionFitness
 from pynsgp.Evolution.Evolution import pyNSGP
+from pynsgp.Evolution.Islands import pyNSGPIslands
 
 
 class pyNSGPEstimator(BaseEstimator, RegressorMixin):
@@ -28,6 +29,28 @@ class pyNSGPEstimator(BaseEstimator, RegressorMixin):
 		use_linear_scaling=True,
 		use_interpretability_model=False, 
 		penalize_duplicates=True,
+		sorting_engine='auto',
+		use_compiled_evaluation=False,
+		subtree_cache_bytes=0,
+		fitness_memo_size=0,
+		duplicate_fingerprint_rows=None,
+		use_copy_on_write=False,
+		use_hash_consing=False,
+		use_simplification=False,
+		n_jobs=1,
+		parallel_backend='process',
+		chunk_size=None,
+		evaluation_mode='full',
+		subsample_size=1000,
+		steady_state=False,
+		constant_optimization=None,
+		constant_optimization_top_k=10,
+		constant_optimization_budget=100,
+		constant_optimization_iterations=10,
+		n_islands=1,
+		migration_interval=10,
+		migration_size=10,
+		migration_topology='ring',
 		verbose=False
 		):
 
@@ -45,7 +68,14 @@ class pyNSGPEstimator(BaseEstimator, RegressorMixin):
 		self.y_ = y
 		
 		fitness_function = SymbolicRegressionFitness( X, y, self.use_linear_scaling, 
-			use_interpretability_model=self.use_interpretability_model )
+			use_interpretability_model=self.use_interpretability_model,
+			use_compiled_evaluation=self.use_compiled_evaluation,
+			subtree_cache_bytes=self.subtree_cache_bytes,
+			fitness_memo_size=self.fitness_memo_size,
+			duplicate_fingerprint_rows=self.duplicate_fingerprint_rows,
+			chunk_size=self.chunk_size,
+			evaluation_mode=self.evaluation_mode,
+			subsample_size=self.subsample_size )
 		
 		terminals = []
 		if self.use_erc:
@@ -54,8 +84,7 @@ class pyNSGPEstimator(BaseEstimator, RegressorMixin):
 		for i in range(n_features):
 			terminals.append(FeatureNode(i))
 
-		nsgp = pyNSGP(fitness_function, 
-			self.functions, terminals, 
+		nsgp_settings = dict(
 			pop_size=self.pop_size, 
 			max_generations=self.max_generations,
 			max_time = self.max_time,
@@ -68,8 +97,30 @@ class pyNSGPEstimator(BaseEstimator, RegressorMixin):
 			max_tree_size=self.max_tree_size,
 			tournament_size=self.tournament_size,
 			penalize_duplicates=self.penalize_duplicates,
+			sorting_engine=self.sorting_engine,
+			use_copy_on_write=self.use_copy_on_write,
+			use_hash_consing=self.use_hash_consing,
+			use_simplification=self.use_simplification,
+			n_jobs=self.n_jobs,
+			parallel_backend=self.parallel_backend,
+			steady_state=self.steady_state,
+			constant_optimization=self.constant_optimization,
+			constant_optimization_top_k=self.constant_optimization_top_k,
+			constant_optimization_budget=self.constant_optimization_budget,
+			constant_optimization_iterations=self.constant_optimization_iterations,
 			verbose=self.verbose)
 
+		if self.n_islands > 1:
+			# pop_size is the size of each island
+			nsgp = pyNSGPIslands(fitness_function, self.functions, terminals,
+				n_islands=self.n_islands,
+				migration_interval=self.migration_interval,
+				migration_size=self.migration_size,
+				topology=self.migration_topology,
+				**nsgp_settings)
+		else:
+			nsgp = pyNSGP(fitness_function, self.functions, terminals, **nsgp_settings)
+
 		nsgp.Run()
 		self.nsgp_ = nsgp
 
@@ -82,7 +133,7 @@ class pyNSGPEstimator(BaseEstimator, RegressorMixin):
 		# Input validation
 		X = check_array(X)
 		fifu = self.nsgp_.fitness_function
-		prediction = fifu.elite.ls_a + fifu.elite.ls_b * fifu.elite.GetOutput( X )
+		prediction = fifu.elite.ls_a + fifu.elite.ls_b * fifu.GetOutput( fifu.elite, X )
 
 		return prediction
 
@@ -119,7 +170,7 @@ class pyNSGPEstimator(BaseEstimator, RegressorMixin):
 
 	def get_population(self):
 		check_is_fitted(self, ['nsgp_'])
-		return self.nsgp_.population
+		return self.nsgp_.population.individuals
 
 	# string representation: front + objectives
 	def __str__(self):
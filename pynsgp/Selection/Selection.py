@@ -2,19 +2,31 @@ import numpy as np
 from copy import deepcopy
 from numpy.random import randint
 
-def TournamentSelect( population, how_many_to_select, tournament_size=4 ):
-	pop_size = len(population)
-	selection = []
+def TournamentSelect( population, how_many_to_select, tournament_size=4, copy_winners=True ):
+	# population is a list of individuals or a Population, whose ranks and crowding distances are read from its arrays
+	individuals = list(population)
+	if hasattr( population, 'ranks' ):
+		ranks = population.ranks
+		crowding_distances = population.crowding_distances
+	else:
+		ranks = np.array( [ p.rank for p in individuals ], dtype=float )
+		crowding_distances = np.array( [ p.crowding_distance for p in individuals ], dtype=float )
 
-	while len(selection) < how_many_to_select:
+	winners = TournamentSelectIndices( ranks, crowding_distances, how_many_to_select, tournament_size=tournament_size )
 
-		best = population[randint(pop_size)]
-		for i in range(tournament_size - 1):
-			contestant = population[randint(pop_size)]
-			if (contestant.rank < best.rank) or (contestant.rank == best.rank and contestant.crowding_distance > best.crowding_distance):
-				best = contestant
+	if copy_winners:
+		return [ deepcopy(individuals[i]) for i in winners.tolist() ]
+	return [ individuals[i] for i in winners.tolist() ]
 
-		survivor = deepcopy(best)
-		selection.append(survivor)
 
-	return selection
\ No newline at end of file
+def TournamentSelectIndices( ranks, crowding_distances, how_many_to_select, tournament_size=4 ):
+	# indices of the winners of how_many_to_select tournaments, whose contestants are all drawn at once;
+	# the winner has the lowest rank and, among those, the largest crowding distance, and ties go to the
+	# contestant drawn first
+	pop_size = len(ranks)
+	contestants = randint( pop_size, size=(how_many_to_select, tournament_size) )
+	contestant_ranks = ranks[contestants]
+	is_best_rank = contestant_ranks == contestant_ranks.min( axis=1, keepdims=True )
+	contestant_distances = np.where( is_best_rank, crowding_distances[contestants], -np.inf )
+	best = np.argmax( contestant_distances, axis=1 )
+	return contestants[ np.arange(how_many_to_select), best ]
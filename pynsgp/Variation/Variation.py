@@ -3,117 +3,138 @@ import numpy as np
 from numpy.random import randint
 from numpy.random import random
 
+from pynsgp.Nodes.PrimitiveSet import PrimitiveSet
 
-def GenerateRandomTree(functions, terminals, max_height, curr_height=0, method='grow', min_depth=2):
-
-	if curr_height == max_height:
-		idx = randint(len(terminals))
-		n = deepcopy( terminals[idx] )
-	else:
-		if method == 'grow' and curr_height >= min_depth:
-			term_n_funs = terminals + functions
-			idx = randint( len(term_n_funs) )
-			n = deepcopy( term_n_funs[idx] )
-		elif method == 'full' or (method == 'grow' and curr_height < min_depth):
-			idx = randint( len(functions) )
-			n = deepcopy( functions[idx] )
-		else:
-			raise ValueError('Unrecognized tree generation method')
 
-		for i in range(n.arity):
-			c = GenerateRandomTree( functions, terminals, max_height, curr_height=curr_height + 1, method=method, min_depth=min_depth )
-			n.AppendChild( c )
-	return n
+# PrimitiveSet of the latest functions and terminals given without one
+_primitive_set = None
 
-def OnePointMutation( individual, functions, terminals ):
-	
-	arity_functions = {}
-	for f in functions:
-		arity = f.arity
-		if arity not in arity_functions:
-			arity_functions[arity] = [f]
-		else:
-			arity_functions[arity].append(f)
+def _GetPrimitiveSet( functions, terminals ):
+	global _primitive_set
+	if _primitive_set is None or not _primitive_set.HasPrimitives( functions, terminals ):
+		_primitive_set = PrimitiveSet( functions, terminals )
+	return _primitive_set
+
+
+def GenerateRandomTree(functions, terminals, max_height, curr_height=0, method='grow', min_depth=2, primitive_set=None):
+
+	if primitive_set is None:
+		primitive_set = _GetPrimitiveSet( functions, terminals )
+	return primitive_set.GenerateRandomTree( max_height, curr_height=curr_height, method=method, min_depth=min_depth )
+
+def OnePointMutation( individual, functions, terminals, copy_on_write=False, primitive_set=None ):
+
+	if primitive_set is None:
+		primitive_set = _GetPrimitiveSet( functions, terminals )
 
 	nodes = individual.GetSubtree()
 	prob = 1.0/len(nodes)
+	replacements = {}
 
 	for i in range(len(nodes)):
 		if random() < prob:
-			arity = nodes[i].arity 
-			if arity == 0:
-				idx = randint( len(terminals) )
-				n = deepcopy( terminals[idx] )
-			else:
-				idx = randint(len(arity_functions[arity]))
-				n = deepcopy(arity_functions[arity][idx])
-			
+			n = primitive_set.NewFunctionOfArity( nodes[i].arity )
+
+			if copy_on_write:
+				replacements[i] = n
+				continue
+
 			# update link to children
 			for child in nodes[i]._children:
 				n.AppendChild(child)
-				
+
 			# update link to parent node
 			p = nodes[i].parent
 			if p:
-				idx = p.DetachChild( nodes[i] )
-				p.InsertChildAtPosition(idx, n)
+				p.ReplaceChild( nodes[i], n )
 			else:
 				nodes[i] = n
 				individual = n
-			
 
-	return individual
+	if copy_on_write and len(replacements) > 0:
+		individual = _RebuildWithReplacements( individual, replacements, [0] )
 
+	return individual
 
 
 
-def SubtreeMutation( individual, functions, terminals, max_height=4 ):
 
-	mutation_branch = GenerateRandomTree( functions, terminals, max_height )
-	
-	nodes = individual.GetSubtree()
+def SubtreeMutation( individual, functions, terminals, max_height=4, copy_on_write=False, primitive_set=None ):
 
-	#nodes = __GetCandidateNodesAtUniformRandomDepth( nodes )
+	mutation_branch = GenerateRandomTree( functions, terminals, max_height, primitive_set=primitive_set )
 
-	to_replace = nodes[randint(len(nodes))]
+	to_replace, path = individual.GetNodeAtPreorderIndex( randint(individual.GetSize()) )
 
-	if not to_replace.parent:
+	if len(path) == 0:
 		del individual
 		return mutation_branch
 
+	if copy_on_write:
+		return _ReplaceAtPath( individual, path, mutation_branch )
 
-	p = to_replace.parent
-	idx = p.DetachChild(to_replace)
-	p.InsertChildAtPosition(idx, mutation_branch)
+	to_replace.parent.ReplaceChildAt( path[-1], mutation_branch )
 
 	return individual
 
 
-def SubtreeCrossover( individual, donor ):
-	
+def SubtreeCrossover( individual, donor, copy_on_write=False ):
+
 	# this version of crossover returns 1 child
 
-	nodes1 = individual.GetSubtree()
-	nodes2 = donor.GetSubtree()	# no need to deep copy all nodes of parent2
+	# the crossover points are drawn by preorder index, without listing the nodes of the parents
+	to_swap1, path = individual.GetNodeAtPreorderIndex( randint(individual.GetSize()) )
+	to_swap2, _ = donor.GetNodeAtPreorderIndex( randint(donor.GetSize()) )
 
-	#nodes1 = __GetCandidateNodesAtUniformRandomDepth( nodes1 )
-	#nodes2 = __GetCandidateNodesAtUniformRandomDepth( nodes2 )
+	if copy_on_write:
+		# neither parent is modified: the child shares the donated subtree and all unchanged subtrees of individual
+		if len(path) == 0:
+			return to_swap2.ShallowCopy()
+		return _ReplaceAtPath( individual, path, to_swap2, share_replacement=True )
 
-	to_swap1 = nodes1[ randint(len(nodes1)) ]
-	to_swap2 = deepcopy( nodes2[ randint(len(nodes2)) ] )	# we deep copy now, only the sutbree from parent2
+	to_swap2 = deepcopy( to_swap2, {id(to_swap2.parent): None} )	# we deep copy now, only the sutbree from parent2
 	to_swap2.parent = None
 
-	p1 = to_swap1.parent
-
-	if not p1:
+	if len(path) == 0:
 		return to_swap2
 
-	idx = p1.DetachChild(to_swap1)
-	p1.InsertChildAtPosition(idx, to_swap2)
+	to_swap1.parent.ReplaceChildAt( path[-1], to_swap2 )
 
 	return individual
 
 
+def _ReplaceAtPath( node, path, replacement, share_replacement=False ):
+	# copies the nodes along the (non-empty) path and shares all other subtrees of node
+	n = node.Clone()
+	for i, c in enumerate(node._children):
+		if i != path[0]:
+			n.AppendSharedChild(c)
+		elif len(path) > 1:
+			n.AppendChild( _ReplaceAtPath( c, path[1:], replacement, share_replacement ) )
+		elif share_replacement:
+			n.AppendSharedChild(replacement)
+		else:
+			n.AppendChild(replacement)
+	return n
+
+
+def _RebuildWithReplacements( node, replacements, position ):
+	# replacements maps preorder positions to new, childless nodes (the same node object may occur at several
+	# positions of a tree that shares subtrees); only the changed nodes and their ancestors are copied
+	n = replacements.get( position[0] )
+	position[0] += 1
+	new_children = [ _RebuildWithReplacements( c, replacements, position ) for c in node._children ]
+	if n is None:
+		if all( [nc is c for nc, c in zip(new_children, node._children)] ):
+			return node
+		n = node.Clone()
+	for nc, c in zip(new_children, node._children):
+		if nc is c:
+			n.AppendSharedChild(c)
+		else:
+			n.AppendChild(nc)
+	return n
+
+
 def __GetCandidateNodesAtUniformRandomDepth( nodes ):
 
 	depths = np.unique( [x.GetDepth() for x in nodes] )
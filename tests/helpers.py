@@ -0,0 +1,14 @@
+from pynsgp.Nodes.SymbolicRegressionNodes import EphemeralRandomConstantNode
+
+
+# factories for building trees by hand in the tests
+
+def Constant( value ):
+	n = EphemeralRandomConstantNode()
+	n.c = value
+	return n
+
+
+def Tree( node, children ):
+	node.SetChildren( children )
+	return node
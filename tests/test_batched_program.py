@@ -0,0 +1,41 @@
+import numpy as np
+
+from pynsgp.Nodes.SymbolicRegressionNodes import *
+from pynsgp.Nodes.PrimitiveSet import PrimitiveSet
+from pynsgp.Nodes.CompiledTree import BatchedProgram
+from pynsgp.Fitness.FitnessFunction import SymbolicRegressionFitness
+
+
+FUNCTIONS = [ AddNode(), SubNode(), MulNode(), DivNode(), AnalyticQuotientNode(), PowNode(), ExpNode(), LogNode(), SinNode(), CosNode() ]
+
+
+def _GetRandomTrees( how_many ):
+	primitive_set = PrimitiveSet( FUNCTIONS, [ EphemeralRandomConstantNode(), FeatureNode(0), FeatureNode(1) ] )
+	return [ primitive_set.GenerateRandomTree( 5 ) for _ in range( how_many ) ]
+
+
+def test_batched_program_matches_recursive_evaluation():
+	np.random.seed(0)
+	X = np.random.randn( 25, 2 )
+	trees = _GetRandomTrees( 200 )
+	program = BatchedProgram()
+	for tree in trees:
+		assert program.AddTree( tree )
+	with np.errstate( all='ignore' ):
+		outputs = program.GetOutputs( X )
+		expected = np.array( [ tree.GetOutput( X ) for tree in trees ] )
+	assert np.array_equal( outputs, expected, equal_nan=True )
+
+
+def test_batched_errors_match_single_errors():
+	np.random.seed(1)
+	X = np.random.randn( 40, 2 )
+	y = X[:,0] * X[:,1] + 1
+	fitness_function = SymbolicRegressionFitness( X, y )
+	trees = _GetRandomTrees( 100 )
+	with np.errstate( all='ignore' ):
+		outputs = np.array( [ tree.GetOutput( X ) for tree in trees ] )
+		batched = fitness_function.ComputeErrors( outputs )
+		single = [ fitness_function.ComputeError( output ) for output in outputs ]
+	for b, s in zip( batched, single ):
+		assert np.isclose( b[0], s[0], rtol=1e-6, atol=1e-9 ) or (np.isinf( b[0] ) and np.isinf( s[0] ))
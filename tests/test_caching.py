@@ -0,0 +1,110 @@
+import numpy as np
+from copy import deepcopy
+
+from pynsgp.Nodes.SymbolicRegressionNodes import *
+from pynsgp.Nodes.PrimitiveSet import PrimitiveSet
+from pynsgp.Fitness.Caching import LRUCache, SubtreeOutputCache
+from pynsgp.Fitness.FitnessFunction import SymbolicRegressionFitness
+
+
+def _GetRandomTrees( how_many ):
+	primitive_set = PrimitiveSet( [ AddNode(), SubNode(), MulNode(), AnalyticQuotientNode(), SinNode() ], [ FeatureNode(0), FeatureNode(1) ] )
+	return [ primitive_set.GenerateRandomTree( 4 ) for _ in range( how_many ) ]
+
+
+def _GetResult( individual ):
+	return ( list(individual.objectives), individual.ls_a, individual.ls_b, individual.cached_output )
+
+
+def test_lru_eviction_at_capacity():
+	cache = LRUCache( 3 )
+	for key in 'abc':
+		cache.Put( key, key.upper() )
+	assert len(cache) == 3 and cache.evictions == 0
+	# 'a' becomes the most recently used, so 'b' is evicted first
+	assert cache.Get( 'a' ) == 'A'
+	cache.Put( 'd', 'D' )
+	assert len(cache) == 3 and cache.evictions == 1
+	assert 'b' not in cache and 'a' in cache and 'c' in cache and 'd' in cache
+	# replacing an entry evicts nothing
+	cache.Put( 'c', 'C2' )
+	assert cache.evictions == 1 and cache.Get( 'c' ) == 'C2'
+	assert cache.Get( 'b' ) is None
+	assert cache.GetStatistics() == { 'entries': 3, 'size': 3, 'hits': 2, 'misses': 1, 'evictions': 1 }
+
+
+def test_lru_eviction_by_size():
+	cache = LRUCache( 10, size_function=len )
+	cache.Put( 0, 'aaaa' )
+	cache.Put( 1, 'bbbb' )
+	cache.Put( 2, 'cccc' )
+	assert 0 not in cache and cache.size == 8
+	# values larger than the whole cache are not stored
+	cache.Put( 3, 'd' * 11 )
+	assert 3 not in cache and cache.size == 8
+
+
+def test_cached_outputs_equal_fresh_evaluation():
+	np.random.seed(0)
+	X = np.random.randn( 50, 2 )
+	y = X[:,0] * X[:,1] + np.sin( X[:,0] )
+	trees = _GetRandomTrees( 100 )
+	# the copies find the outputs of their subtrees in the cache
+	trees += [ deepcopy(tree) for tree in trees ]
+	# up to about 20 outputs, so that some are evicted
+	for subtree_cache_bytes in [ 10**7, 20 * X.shape[0] * 8 ]:
+		cached_fitness_function = SymbolicRegressionFitness( X, y, subtree_cache_bytes=subtree_cache_bytes )
+		fitness_function = SymbolicRegressionFitness( X, y )
+		for tree in trees:
+			cached_fitness_function.Evaluate( tree )
+			cached_result = _GetResult( tree )
+			fitness_function.Evaluate( tree )
+			assert cached_result == _GetResult( tree )
+		cache = cached_fitness_function.subtree_cache
+		assert cache.hits > 0 and cache.size <= subtree_cache_bytes
+		assert (cache.evictions > 0) == (subtree_cache_bytes < 10**7)
+
+
+def test_cached_outputs_are_read_only():
+	np.random.seed(1)
+	X = np.random.randn( 10, 2 )
+	cache = SubtreeOutputCache( 10**6 )
+	tree = _GetRandomTrees( 1 )[0]
+	while tree.arity == 0:
+		tree = _GetRandomTrees( 1 )[0]
+	output = cache.GetOutput( tree, X )
+	assert np.array_equal( output, tree.GetOutput( X ) ) and not output.flags.writeable
+
+
+def test_memoised_errors_equal_fresh_evaluation():
+	np.random.seed(2)
+	X = np.random.randn( 50, 2 )
+	y = X[:,0] * X[:,1] + np.sin( X[:,0] )
+	trees = _GetRandomTrees( 100 )
+	memo_fitness_function = SymbolicRegressionFitness( X, y, fitness_memo_size=50 )
+	fitness_function = SymbolicRegressionFitness( X, y )
+	for tree in trees + [ deepcopy(tree) for tree in trees[::-1] ]:
+		memo_fitness_function.Evaluate( tree )
+		memo_result = _GetResult( tree )
+		fitness_function.Evaluate( tree )
+		assert memo_result == _GetResult( tree )
+	# only the 50 most recently evaluated trees are remembered
+	memo = memo_fitness_function.fitness_memo
+	assert len(memo) <= 50 and memo.evictions > 0
+	assert memo_fitness_function.cache_hits > 0
+	assert memo_fitness_function.evaluations + memo_fitness_function.cache_hits == 2 * len(trees)
+
+
+def test_memoised_batches_equal_fresh_evaluation():
+	np.random.seed(3)
+	X = np.random.randn( 50, 2 )
+	y = X[:,0] - X[:,1]
+	trees = _GetRandomTrees( 50 )
+	trees += [ deepcopy(tree) for tree in trees ]
+	memo_fitness_function = SymbolicRegressionFitness( X, y, fitness_memo_size=1000 )
+	memo_fitness_function.EvaluateBatch( trees, n_jobs=1, backend='dag' )
+	memo_results = [ _GetResult( tree ) for tree in trees ]
+	fitness_function = SymbolicRegressionFitness( X, y )
+	for tree, memo_result in zip( trees, memo_results ):
+		fitness_function.Evaluate( tree )
+		assert memo_result == _GetResult( tree )
@@ -0,0 +1,33 @@
+import numpy as np
+
+from pynsgp.Nodes.SymbolicRegressionNodes import *
+from pynsgp.Nodes.PrimitiveSet import PrimitiveSet
+from pynsgp.Nodes.CompiledTree import Compile, StackMachine
+
+
+FUNCTIONS = [ AddNode(), SubNode(), MulNode(), DivNode(), AnalyticQuotientNode(), PowNode(), ExpNode(), LogNode(), SinNode(), CosNode() ]
+
+
+def test_stack_machine_matches_recursive_evaluation():
+	np.random.seed(0)
+	X = np.random.randn( 25, 3 )
+	primitive_set = PrimitiveSet( FUNCTIONS, [ EphemeralRandomConstantNode(), FeatureNode(0), FeatureNode(1), FeatureNode(2) ] )
+	stack_machine = StackMachine()
+	for _ in range( 300 ):
+		tree = primitive_set.GenerateRandomTree( 5 )
+		with np.errstate( all='ignore' ):
+			expected = tree.GetOutput( X )
+			output = stack_machine.GetOutput( Compile( tree ), X )
+		assert np.array_equal( output, expected, equal_nan=True )
+
+
+def test_unknown_node_types_are_not_compiled():
+	class SquareNode(Node):
+		arity = 1
+	tree = SquareNode()
+	tree.AppendChild( FeatureNode(0) )
+	try:
+		Compile( tree )
+	except ValueError:
+		return
+	assert False
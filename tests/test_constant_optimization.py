@@ -0,0 +1,98 @@
+import numpy as np
+
+from pynsgp.Nodes.BaseNode import Node
+from pynsgp.Nodes.SymbolicRegressionNodes import *
+from pynsgp.Nodes.PrimitiveSet import PrimitiveSet
+from pynsgp.Fitness.ConstantOptimization import GetConstantNodes, GetOutputAndJacobian, OptimizeConstants
+from pynsgp.Fitness.FitnessFunction import SymbolicRegressionFitness
+from pynsgp.Evolution.Evolution import pyNSGP
+
+from helpers import Constant, Tree
+
+
+def test_jacobian_matches_finite_differences():
+	np.random.seed(0)
+	X = np.random.randn( 20, 2 )
+	primitive_set = PrimitiveSet( [ AddNode(), SubNode(), MulNode(), DivNode(), AnalyticQuotientNode(), ExpNode(), LogNode(), SinNode(), CosNode() ],
+		[ EphemeralRandomConstantNode(), FeatureNode(0), FeatureNode(1) ] )
+	checked = 0
+	for _ in range( 200 ):
+		tree = primitive_set.GenerateRandomTree( 4 )
+		constant_nodes = GetConstantNodes( tree )
+		if len(constant_nodes) == 0:
+			continue
+		with np.errstate( all='ignore' ):
+			output, jacobian = GetOutputAndJacobian( tree, X, constant_nodes )
+			assert np.array_equal( output, tree.GetOutput( X ), equal_nan=True )
+			for k, n in enumerate( constant_nodes ):
+				c = n.c
+				h = 1e-6 * max( 1.0, abs(c) )
+				n.c = c + h
+				output_plus = tree.GetOutput( X )
+				n.c = c - h
+				output_minus = tree.GetOutput( X )
+				n.c = c
+				finite_differences = (output_plus - output_minus) / (2*h)
+				# away from the kinks of the protected operators, where finite differences are meaningless
+				smooth = np.isfinite( finite_differences ) & np.isfinite( jacobian[:, k] ) & (np.abs( finite_differences ) < 1e3) \
+					& np.isclose( (output_plus - output) / h, (output - output_minus) / h, rtol=1e-2, atol=1e-3 )
+				assert np.allclose( finite_differences[smooth], jacobian[smooth, k], rtol=1e-3, atol=1e-4 )
+				checked += 1
+	assert checked > 50
+
+
+def test_levenberg_marquardt_recovers_constants():
+	np.random.seed(1)
+	X = np.random.randn( 100, 2 )
+	y = 2*X[:,0]*np.sin( 1.7*X[:,1] + 0.3 ) + 1
+	slope = Constant(1.0)
+	offset = Constant(0.0)
+	tree = Tree( MulNode(), [ FeatureNode(0), Tree( SinNode(), [ Tree( AddNode(), [ Tree( MulNode(), [ slope, FeatureNode(1) ] ), offset ] ) ] ) ] )
+	output, evaluations = OptimizeConstants( tree, X, y, max_iterations=30, max_evaluations=30 )
+	assert output is not None and evaluations <= 30
+	assert np.isclose( slope.c, 1.7, atol=1e-4 ) and np.isclose( offset.c, 0.3, atol=1e-4 )
+
+
+def test_stage_stops_at_max_evaluations():
+	np.random.seed(2)
+	X = np.random.randn( 100, 2 )
+	y = np.sin( 1.7*X[:,0] + 0.5 ) + X[:,1]
+	fitness_function = SymbolicRegressionFitness( X, y )
+	nsgp = pyNSGP( fitness_function, [ AddNode(), MulNode(), SinNode() ], [ EphemeralRandomConstantNode(), FeatureNode(0), FeatureNode(1) ],
+		pop_size=30, constant_optimization='top_k', constant_optimization_budget=1000 )
+	nsgp.Initialize()
+	for extra in [ 1, 5, 17 ]:
+		nsgp.max_evaluations = fitness_function.evaluations + extra
+		nsgp._tuned_individuals = set()
+		nsgp._OptimizeConstants()
+		assert fitness_function.evaluations <= nsgp.max_evaluations
+
+
+class _SquareNode(Node):
+	# custom node that only implements GetOutput
+	arity = 1
+
+	def GetOutput( self, X ):
+		return np.square( self._children[0].GetOutput( X ) )
+
+	def __repr__( self ):
+		return 'square'
+
+
+def test_custom_nodes_without_derivatives_are_skipped():
+	np.random.seed(3)
+	X = np.random.randn( 50, 2 )
+	y = np.square( X[:,0] + 0.5 )
+	constant = Constant(1.0)
+	tree = Tree( _SquareNode(), [ Tree( AddNode(), [ FeatureNode(0), constant ] ) ] )
+	assert OptimizeConstants( tree, X, y ) == (None, 0)
+	assert constant.c == 1.0
+
+	# a custom node over a subtree without constants still has an output
+	tree = Tree( AddNode(), [ Tree( _SquareNode(), [ FeatureNode(0) ] ), Constant(1.0) ] )
+	output, evaluations = OptimizeConstants( tree, X, y )
+	assert evaluations > 0
+
+	nsgp = pyNSGP( SymbolicRegressionFitness( X, y ), [ AddNode(), MulNode(), _SquareNode() ], [ EphemeralRandomConstantNode(), FeatureNode(0), FeatureNode(1) ],
+		pop_size=20, max_generations=2, constant_optimization='top_k' )
+	nsgp.Run()
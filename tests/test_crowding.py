@@ -0,0 +1,44 @@
+import numpy as np
+
+from pynsgp.Evolution import Survival
+
+
+def _SelectByCrowdingDistanceReference( objectives, how_many ):
+	# the original object-based implementation: in-place sorts of the front by each objective, then a
+	# stable descending sort by crowding distance
+	front = list( range( len(objectives) ) )
+	distances = [ 0.0 ] * len(front)
+	for i in range( objectives.shape[1] ):
+		front.sort( key=lambda p: objectives[p, i] )
+		distances[front[0]] = distances[front[-1]] = np.inf
+		min_obj = objectives[front[0], i]
+		max_obj = objectives[front[-1], i]
+		if min_obj == max_obj:
+			continue
+		for j in range( 1, len(front) - 1 ):
+			if np.isinf( distances[front[j]] ):
+				continue
+			distances[front[j]] += ( objectives[front[j+1], i] - objectives[front[j-1], i] ) / (max_obj - min_obj)
+	front.sort( key=lambda p: distances[p], reverse=True )
+	return np.array( distances ), front[:how_many]
+
+
+def test_crowding_distances_and_selection_match_reference():
+	np.random.seed(0)
+	for _ in range( 200 ):
+		n = np.random.randint( 1, 30 )
+		# few distinct values, so that many distances tie
+		objectives = np.random.randint( 0, 5, size=(n, 2) ).astype(float)
+		how_many = np.random.randint( 0, n + 1 )
+		expected_distances, expected = _SelectByCrowdingDistanceReference( objectives, how_many )
+
+		distances, order = Survival.ComputeCrowdingDistances( objectives, return_order=True )
+		assert np.array_equal( distances, expected_distances )
+		chosen = order[ Survival.SelectByCrowdingDistance( distances[order], how_many ) ]
+		if how_many < n:
+			assert chosen.tolist() == expected
+
+
+def test_ties_are_broken_by_position():
+	distances = np.array( [ 1.0, np.inf, 0.5, np.inf, 1.0, np.inf ] )
+	assert Survival.SelectByCrowdingDistance( distances, 4 ).tolist() == [ 1, 3, 5, 0 ]
@@ -0,0 +1,91 @@
+import numpy as np
+
+from pynsgp.Nodes.SymbolicRegressionNodes import *
+from pynsgp.Nodes.PrimitiveSet import PrimitiveSet
+from pynsgp.Fitness.FitnessFunction import SymbolicRegressionFitness
+from pynsgp.Fitness.Streaming import RunningMoments
+
+
+def _GetData( n ):
+	X = np.random.randn( n, 2 )
+	y = X[:,0] * X[:,1] + np.sin( X[:,0] ) + 0.1 * np.random.randn( n )
+	return X, y
+
+
+def _GetRandomTrees( how_many ):
+	primitive_set = PrimitiveSet( [ AddNode(), SubNode(), MulNode(), AnalyticQuotientNode(), SinNode(), ExpNode() ],
+		[ EphemeralRandomConstantNode(), FeatureNode(0), FeatureNode(1) ] )
+	return [ primitive_set.GenerateRandomTree( 4 ) for _ in range( how_many ) ]
+
+
+def test_racing_lower_bound_never_exceeds_full_error():
+	np.random.seed(0)
+	X, y = _GetData( 300 )
+	for use_linear_scaling in [ True, False ]:
+		fitness_function = SymbolicRegressionFitness( X, y, use_linear_scaling=use_linear_scaling, evaluation_mode='racing', subsample_size=10 )
+		for tree in _GetRandomTrees( 200 ):
+			with np.errstate( all='ignore' ):
+				output = tree.GetOutput( X )
+				error = fitness_function.ComputeError( output )[0]
+				order = np.random.permutation( len(y) )
+				moments = RunningMoments()
+				for rows in np.array_split( order, 6 ):
+					moments.Update( output[rows], y[rows] )
+					assert fitness_function._ComputeErrorLowerBound( moments, len(y) ) <= error
+
+
+def test_racing_only_discards_dominated_individuals():
+	np.random.seed(1)
+	X, y = _GetData( 400 )
+	fitness_function = SymbolicRegressionFitness( X, y, evaluation_mode='racing', subsample_size=10 )
+	full_fitness_function = SymbolicRegressionFitness( X, y )
+	population = _GetRandomTrees( 30 )
+	for p in population:
+		fitness_function._EvaluateOnAllRows( p )
+	fitness_function.PrepareGeneration( population )
+
+	stopped = 0
+	for tree in _GetRandomTrees( 300 ):
+		with np.errstate( all='ignore' ):
+			fitness_function.Evaluate( tree )
+			raced_objectives = list( tree.objectives )
+			raced_on_all_rows = tree.evaluated_on_all_rows
+			full_fitness_function.Evaluate( tree )
+		if raced_on_all_rows:
+			assert raced_objectives == tree.objectives
+			continue
+		stopped += 1
+		# the race stopped early, so full evaluation must also find it dominated by the population
+		assert raced_objectives[0] <= tree.objectives[0]
+		assert any( [ p.objectives[0] < tree.objectives[0] and p.objectives[1] <= tree.objectives[1] for p in population ] )
+	assert stopped > 0
+
+
+def test_subsample_errors_are_errors_on_the_rows():
+	np.random.seed(2)
+	X, y = _GetData( 500 )
+	for evaluation_mode in [ 'random_subsample', 'stratified_subsample' ]:
+		fitness_function = SymbolicRegressionFitness( X, y, evaluation_mode=evaluation_mode, subsample_size=50 )
+		rows = np.flatnonzero( np.isin( X[:,0], fitness_function.subsample_X[:,0] ) )
+		assert len(rows) == 50 and np.array_equal( X[rows], fitness_function.subsample_X )
+		subsample_fitness_function = SymbolicRegressionFitness( X[rows], y[rows] )
+		full_fitness_function = SymbolicRegressionFitness( X, y )
+		for tree in _GetRandomTrees( 50 ):
+			with np.errstate( all='ignore' ):
+				fitness_function.Evaluate( tree )
+				assert not tree.evaluated_on_all_rows
+				assert tree.objectives[0] == subsample_fitness_function.ComputeError( tree.GetOutput( X[rows] ) )[0]
+				fitness_function.EvaluateOnAllRows( [ tree ] )
+				assert tree.evaluated_on_all_rows
+				assert tree.objectives[0] == full_fitness_function.ComputeError( tree.GetOutput( X ) )[0]
+
+
+def test_stratified_subsample_has_one_row_per_stratum():
+	np.random.seed(3)
+	X, y = _GetData( 500 )
+	fitness_function = SymbolicRegressionFitness( X, y, evaluation_mode='stratified_subsample', subsample_size=50 )
+	for _ in range( 5 ):
+		fitness_function.ResampleRows()
+		target_ranks = np.searchsorted( np.sort( y ), fitness_function.subsample_target[0] )
+		strata = target_ranks // 10
+		assert np.array_equal( np.sort( strata ), np.arange( 50 ) )
@@ -0,0 +1,34 @@
+import numpy as np
+
+from pynsgp.Fitness.FitnessFunction import SymbolicRegressionFitness
+
+
+def _ComputeErrorTwoPass( output, y ):
+	# the original computation of the linearly scaled error
+	b = np.cov( y, output )[0,1] / ( np.var(output) + 1e-10 )
+	a = np.mean(y) - b*np.mean(output)
+	return np.mean( np.square( y - (a + b*output) ) ), a, b
+
+
+def test_fused_error_matches_two_pass_error():
+	np.random.seed(0)
+	X = np.random.randn( 200, 2 )
+	y = 3*X[:,0] - X[:,1] + 10
+	fitness_function = SymbolicRegressionFitness( X, y )
+	outputs = [ X[:,0], X[:,0]*X[:,1], 1e6 + X[:,1], np.full( 200, 2.5 ), 1e200 * X[:,0], np.exp( 5*X[:,0] ) ]
+	for output in outputs:
+		with np.errstate( all='ignore' ):
+			error, a, b, _ = fitness_function.ComputeError( output )
+			expected_error, expected_a, expected_b = _ComputeErrorTwoPass( output, y )
+		assert np.isclose( error, expected_error, rtol=1e-6, atol=1e-9 ) or (np.isnan( expected_error ) and np.isinf( error ))
+		if np.isfinite( expected_error ):
+			assert np.isclose( b, expected_b, rtol=1e-6, atol=1e-12 ) and np.isclose( a, expected_a, rtol=1e-6, atol=1e-9 )
+
+
+def test_error_without_linear_scaling():
+	np.random.seed(1)
+	X = np.random.randn( 50, 1 )
+	y = X[:,0] + 1
+	fitness_function = SymbolicRegressionFitness( X, y, use_linear_scaling=False )
+	error, a, b, _ = fitness_function.ComputeError( X[:,0] )
+	assert np.isclose( error, 1.0 ) and a == 0.0 and b == 1.0
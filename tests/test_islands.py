@@ -0,0 +1,68 @@
+import numpy as np
+
+from pynsgp.Nodes.SymbolicRegressionNodes import *
+from pynsgp.Fitness.FitnessFunction import SymbolicRegressionFitness
+from pynsgp.Evolution import Survival
+from pynsgp.Evolution.Evolution import pyNSGP
+from pynsgp.Evolution.Islands import pyNSGPIslands
+
+
+FUNCTIONS = [ AddNode(), SubNode(), MulNode(), SinNode() ]
+TERMINALS = [ EphemeralRandomConstantNode(), FeatureNode(0), FeatureNode(1) ]
+
+
+def _GetFitnessFunction( seed ):
+	X = np.random.RandomState( seed ).randn( 50, 2 )
+	return SymbolicRegressionFitness( X, X[:,0] * X[:,1] + X[:,0] )
+
+
+def _CheckRanks( population ):
+	# duplicates have an infinite rank, and every other individual has a smaller rank than those it dominates
+	ranked = np.flatnonzero( np.isfinite( population.ranks ) )
+	D = Survival.ComputeDominationMatrix( population.objectives[ranked] )
+	ranks = population.ranks[ranked]
+	assert np.all( ranks[:, None] < ranks[None, :], where=D )
+	assert ranks.min() == 0
+	assert [ p.rank for p in population.individuals ] == [ int(r) if np.isfinite(r) else r for r in population.ranks.tolist() ]
+
+
+def test_migrants_keep_population_size_and_ranks():
+	np.random.seed(0)
+	source = pyNSGP( _GetFitnessFunction(0), FUNCTIONS, TERMINALS, pop_size=20 )
+	source.Initialize()
+	source.RunGenerations( 3 )
+	for use_hash_consing in [ False, True ]:
+		nsgp = pyNSGP( _GetFitnessFunction(0), FUNCTIONS, TERMINALS, pop_size=20, use_copy_on_write=use_hash_consing, use_hash_consing=use_hash_consing )
+		nsgp.Initialize()
+		nsgp.ReceiveMigrants( source.latest_front )
+		assert len(nsgp.population) == 20
+		_CheckRanks( nsgp.population )
+		nsgp.RunGenerations( 2 )
+		assert len(nsgp.population) == 20
+		_CheckRanks( nsgp.population )
+
+
+def test_migration_topologies():
+	islands = pyNSGPIslands( None, FUNCTIONS, TERMINALS, n_islands=4, topology='ring' )
+	emigrants = [ [ 'a' ], [ 'b' ], [ 'c' ], [ 'd' ] ]
+	assert islands._Migrate( emigrants ) == [ [ 'd' ], [ 'a' ], [ 'b' ], [ 'c' ] ]
+	islands.topology = 'fully_connected'
+	assert islands._Migrate( emigrants )[1] == [ 'a', 'c', 'd' ]
+	islands.topology = 'random'
+	for i, migrants in enumerate( islands._Migrate( emigrants ) ):
+		assert len(migrants) == 1 and migrants != emigrants[i]
+
+
+def test_islands_keep_population_sizes_and_merge_the_fronts():
+	np.random.seed(1)
+	islands = pyNSGPIslands( _GetFitnessFunction(1), FUNCTIONS, TERMINALS, n_islands=2, migration_interval=2, migration_size=5,
+		max_generations=6, pop_size=20 )
+	islands.Run()
+	assert len(islands.population) == 2 * 20
+	assert islands.generations == 6
+	front = Survival.GetObjectivesMatrix( islands.latest_front )
+	_, ranks = Survival.FastNonDominatedSorting( front )
+	assert len(islands.latest_front) > 0 and np.all( ranks == 0 )
+	fingerprints = [ p.cached_output for p in islands.latest_front ]
+	assert len(set(fingerprints)) == len(fingerprints)
+	assert islands.fitness_function.elite.objectives[0] == min( islands.population.objectives[:,0] )
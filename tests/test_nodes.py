@@ -0,0 +1,44 @@
+from copy import deepcopy
+
+from pynsgp.Nodes.BaseNode import Node
+from pynsgp.Nodes.SymbolicRegressionNodes import *
+
+
+def test_nodes_have_no_dict():
+	for node in [ AddNode(), SinNode(), FeatureNode(0), EphemeralRandomConstantNode() ]:
+		assert not hasattr( node, '__dict__' )
+
+
+def test_individual_properties_are_kept_in_a_record():
+	node = AddNode()
+	assert node._record is None
+	assert node.objectives == [] and node.rank == 0 and node.ls_a == 0.0 and node.ls_b == 1.0 and node.evaluated_on_all_rows
+	node.objectives = [ 1.0, 3 ]
+	node.crowding_distance = 0.5
+	node.cached_output = b'fingerprint'
+	assert node._record is not None
+	assert node.objectives == [ 1.0, 3 ] and node.crowding_distance == 0.5 and node.cached_output == b'fingerprint'
+
+
+def test_copies_have_their_own_record():
+	node = AddNode()
+	node.SetChildren( [ FeatureNode(0), EphemeralRandomConstantNode() ] )
+	node.objectives = [ 1.0, 3 ]
+	for copy in [ node.Clone(), deepcopy(node), node.CopySubtree() ]:
+		assert copy.objectives == [ 1.0, 3 ]
+		copy.objectives.append( 0 )
+		copy.rank = 2
+		assert node.objectives == [ 1.0, 3 ] and node.rank == 0
+	assert node.CopySubtree()._children[0].id == 0
+
+
+def test_class_constants_and_subclasses_without_slots():
+	assert AddNode.arity == 2 and AddNode().arity == 2 and SinNode().is_not_arithmetic
+	class ScaledFeatureNode(FeatureNode):
+		def __init__( self, id, scale ):
+			super(ScaledFeatureNode, self).__init__( id )
+			self.scale = scale
+	node = ScaledFeatureNode( 1, 2.0 )
+	clone = node.Clone()
+	assert clone.id == 1 and clone.scale == 2.0
+	assert node.GetFactory()().scale == 2.0
@@ -0,0 +1,58 @@
+import numpy as np
+
+from pynsgp.Evolution import Survival
+from pynsgp.Evolution.ParetoArchive import ParetoArchive
+
+
+def _CheckAgainstFullSorting( archive, points ):
+	keys = sorted( points.keys() )
+	_, ranks = Survival.FastNonDominatedSorting( np.array( [ points[k] for k in keys ] ), engine='numpy' )
+	assert len(archive) == len(keys)
+	for key, rank in zip( keys, ranks.tolist() ):
+		assert archive.GetRank( key ) == rank
+	assert sorted( [ k for front in archive.GetFronts() for k in front ] ) == keys
+
+
+def test_insertions_and_removals_match_full_sorting():
+	np.random.seed(0)
+	for _ in range( 20 ):
+		archive = ParetoArchive()
+		points = {}
+		next_key = 0
+		for _ in range( 150 ):
+			if len(points) > 0 and np.random.random() < 0.35:
+				key = list( points.keys() )[ np.random.randint( len(points) ) ]
+				archive.Remove( key )
+				del points[key]
+			else:
+				# few distinct values, so that there are ties and duplicates
+				objectives = np.random.randint( 0, 8, size=2 ).astype(float).tolist()
+				archive.Insert( next_key, objectives )
+				points[next_key] = objectives
+				next_key += 1
+			_CheckAgainstFullSorting( archive, points )
+
+		removed = list( points.keys() )[ ::3 ]
+		archive.RemoveMany( removed )
+		for key in removed:
+			del points[key]
+		_CheckAgainstFullSorting( archive, points )
+
+
+def test_incremental_engine_matches_sweep():
+	np.random.seed(1)
+	objectives = np.random.randint( 0, 10, size=(300, 2) ).astype(float)
+	fronts, ranks = Survival.FastNonDominatedSorting( objectives, engine='incremental' )
+	expected_fronts, expected_ranks = Survival.FastNonDominatedSorting( objectives, engine='sweep' )
+	assert np.array_equal( ranks, expected_ranks )
+	assert [ f.tolist() for f in fronts ] == [ f.tolist() for f in expected_fronts ]
+
+
+def test_only_two_objectives_are_supported():
+	archive = ParetoArchive()
+	for objectives in [ [1.0, 2.0, 3.0], [np.nan, 1.0] ]:
+		try:
+			archive.Insert( 0, objectives )
+		except ValueError:
+			continue
+		assert False
@@ -0,0 +1,114 @@
+import numpy as np
+from copy import deepcopy
+
+from pynsgp.Nodes.BaseNode import Node
+from pynsgp.Nodes.SymbolicRegressionNodes import *
+from pynsgp.Nodes.PrimitiveSet import PrimitiveSet
+from pynsgp.Nodes.Simplification import Simplify
+from pynsgp.Fitness.FitnessFunction import SymbolicRegressionFitness
+from pynsgp.Evolution.Evolution import pyNSGP
+
+from helpers import Constant, Tree
+
+
+FUNCTIONS = [ AddNode(), SubNode(), MulNode(), DivNode(), AnalyticQuotientNode(), PowNode(), ExpNode(), LogNode(), SinNode(), CosNode() ]
+
+
+def _GetRandomTrees( how_many ):
+	# constants are often 0 or 1, so that the identities apply
+	primitive_set = PrimitiveSet( FUNCTIONS, [ EphemeralRandomConstantNode(), FeatureNode(0), FeatureNode(1) ] )
+	trees = []
+	for _ in range( how_many ):
+		tree = primitive_set.GenerateRandomTree( 5 )
+		for n in tree.GetSubtree():
+			if isinstance( n, EphemeralRandomConstantNode ) and np.random.random() < 0.3:
+				n.c = float( np.random.randint(2) )
+		trees.append( tree )
+	return trees
+
+
+def _CheckLinks( tree ):
+	assert tree.parent is None
+	for n in tree.GetSubtree():
+		assert n.GetSize() == 1 + sum( [c.GetSize() for c in n._children] )
+		for c in n._children:
+			assert c.parent is n
+
+
+def test_identities_and_folding():
+	x = FeatureNode(0)
+	assert Simplify( Tree( MulNode(), [ x, Constant(1.0) ] ) ) is x
+	assert Simplify( Tree( AddNode(), [ Constant(0.0), FeatureNode(1) ] ) ).GetHumanExpression() == 'x1'
+	difference = Simplify( Tree( SubNode(), [ Tree( SinNode(), [ FeatureNode(0) ] ), Tree( SinNode(), [ FeatureNode(0) ] ) ] ) )
+	assert isinstance( difference, EphemeralRandomConstantNode ) and difference.c == 0.0
+	folded = Simplify( Tree( AddNode(), [ FeatureNode(0), Tree( MulNode(), [ Constant(2.0), Constant(3.0) ] ) ] ) )
+	assert folded.GetSize() == 3 and folded.GetHumanExpression() == '( x0 + 6.0 )'
+	# not exact for the protected division
+	assert Simplify( Tree( DivNode(), [ FeatureNode(0), Constant(1.0) ] ) ).GetSize() == 3
+
+
+def test_constant_results_only_for_finite_operands():
+	X = np.array( [ [1000.0], [1.0] ] )
+	exponential = lambda: Tree( ExpNode(), [ FeatureNode(0) ] )
+	for tree in [ Tree( MulNode(), [ exponential(), Constant(0.0) ] ), Tree( SubNode(), [ exponential(), exponential() ] ),
+		Tree( DivNode(), [ Constant(0.0), Tree( MulNode(), [ exponential(), Constant(0.0) ] ) ] ) ]:
+		with np.errstate( all='ignore' ):
+			output = tree.GetOutput( X )
+			simplified = Simplify( tree )
+			assert np.array_equal( simplified.GetOutput( X ), output, equal_nan=True )
+		assert not np.isfinite( output[0] )
+	assert Simplify( Tree( MulNode(), [ FeatureNode(0), Constant(0.0) ] ) ).GetHumanExpression() == '0.0'
+
+
+class _SquareNode(Node):
+	# custom node that only implements GetOutput
+	arity = 1
+
+	def GetOutput( self, X ):
+		return np.square( self._children[0].GetOutput( X ) )
+
+	def __repr__( self ):
+		return 'square'
+
+
+def test_custom_nodes_are_not_folded():
+	tree = Tree( AddNode(), [ FeatureNode(0), Tree( _SquareNode(), [ Constant(3.0) ] ) ] )
+	simplified = Simplify( tree )
+	assert simplified.GetSize() == 4
+	assert np.array_equal( simplified.GetOutput( np.ones( (2, 1) ) ), np.full( 2, 10.0 ) )
+
+
+def test_output_is_equal_where_finite():
+	np.random.seed(0)
+	X = np.random.randn( 30, 2 )
+	for tree in _GetRandomTrees( 500 ):
+		with np.errstate( all='ignore' ):
+			output = tree.GetOutput( X )
+			simplified = Simplify( deepcopy( tree ) )
+			simplified_output = simplified.GetOutput( X )
+		_CheckLinks( simplified )
+		assert simplified.GetSize() <= tree.GetSize()
+		finite = np.isfinite( output )
+		assert np.allclose( output[finite], simplified_output[finite], rtol=1e-9, atol=1e-12 )
+		# outputs that overflow are not made finite, so that the tree is still culled
+		assert not np.isfinite( simplified_output[~finite] ).any()
+
+
+def test_copy_on_write_leaves_the_tree_unchanged():
+	np.random.seed(1)
+	for tree in _GetRandomTrees( 200 ):
+		expression = tree.GetHumanExpression()
+		in_place = Simplify( deepcopy( tree ) ).GetHumanExpression()
+		assert Simplify( tree, copy_on_write=True ).GetHumanExpression() == in_place
+		assert tree.GetHumanExpression() == expression
+
+
+def test_population_respects_min_depth():
+	np.random.seed(2)
+	X = np.random.randn( 50, 2 )
+	y = X[:,0] - X[:,1]
+	for use_copy_on_write in [ False, True ]:
+		nsgp = pyNSGP( SymbolicRegressionFitness( X, y ), [ AddNode(), SubNode(), MulNode() ], [ Constant(0.0), Constant(1.0), FeatureNode(0), FeatureNode(1) ],
+			pop_size=50, max_generations=3, min_depth=2, use_simplification=True, use_copy_on_write=use_copy_on_write )
+		nsgp.Run()
+		assert all( [p.GetHeight() >= 2 for p in nsgp.population.individuals] )
@@ -0,0 +1,61 @@
+import numpy as np
+
+from pynsgp.Nodes.SymbolicRegressionNodes import *
+from pynsgp.Evolution import Survival
+from pynsgp.Evolution.Evolution import pyNSGP
+
+
+def _ComputeRanksBruteForce( objectives ):
+	# peels off the non-dominated points, front by front
+	n = len(objectives)
+	ranks = np.full( n, -1 )
+	rank = 0
+	while (ranks < 0).any():
+		remaining = np.flatnonzero( ranks < 0 )
+		front = [ i for i in remaining if not any( [ np.all( objectives[j] <= objectives[i] ) and np.any( objectives[j] < objectives[i] ) for j in remaining ] ) ]
+		ranks[front] = rank
+		rank += 1
+	return ranks
+
+
+def _GetRandomObjectives( n, n_objectives ):
+	# few distinct values, so that there are ties and duplicates
+	return np.random.randint( 0, 6, size=(n, n_objectives) ).astype(float)
+
+
+def test_engines_match_brute_force():
+	np.random.seed(0)
+	for _ in range( 100 ):
+		n_objectives = np.random.choice( [2, 3] )
+		objectives = _GetRandomObjectives( np.random.randint( 1, 40 ), n_objectives )
+		expected = _ComputeRanksBruteForce( objectives )
+		engines = [ 'auto', 'numpy', 'sweep' ] if n_objectives == 2 else [ 'auto', 'numpy' ]
+		for engine in engines:
+			fronts, ranks = Survival.FastNonDominatedSorting( objectives, engine=engine )
+			assert np.array_equal( ranks, expected )
+			assert [ f.tolist() for f in fronts ] == [ np.flatnonzero( expected == r ).tolist() for r in range( expected.max() + 1 ) ]
+
+
+def test_legacy_engine_matches_brute_force():
+	np.random.seed(1)
+	nsgp = pyNSGP( None, [ AddNode() ], [ FeatureNode(0) ], sorting_engine='legacy', penalize_duplicates=False )
+	for _ in range( 30 ):
+		objectives = _GetRandomObjectives( np.random.randint( 1, 30 ), 2 )
+		population = []
+		for o in objectives.tolist():
+			p = FeatureNode(0)
+			p.objectives = o
+			population.append( p )
+		fronts = nsgp.FastNonDominatedSorting( population )
+		expected = _ComputeRanksBruteForce( objectives )
+		positions = { id(p): i for i, p in enumerate(population) }
+		for rank, front in enumerate( fronts ):
+			assert sorted( [ positions[id(p)] for p in front ] ) == np.flatnonzero( expected == rank ).tolist()
+
+
+def test_unknown_engine_is_rejected():
+	try:
+		Survival.FastNonDominatedSorting( np.zeros( (3, 2) ), engine='unknown' )
+	except ValueError:
+		return
+	assert False
@@ -0,0 +1,89 @@
+import numpy as np
+
+from pynsgp.Nodes.SymbolicRegressionNodes import *
+from pynsgp.Fitness.FitnessFunction import SymbolicRegressionFitness
+from pynsgp.Evolution import Survival
+from pynsgp.Evolution.Evolution import pyNSGP
+from pynsgp.Evolution.Population import Population
+
+from helpers import Constant, Tree
+
+
+def test_insertion_matches_full_sorting():
+	np.random.seed(0)
+	for _ in range( 30 ):
+		objectives = np.random.randint( 0, 6, size=(1, 2) ).astype(float)
+		ranks = np.zeros( 1 )
+		for _ in range( 40 ):
+			new_objectives = np.random.randint( 0, 6, size=2 ).astype(float)
+			new_rank, ranks = Survival.InsertIntoRanking( objectives, ranks, new_objectives )
+			objectives = np.vstack( (objectives, new_objectives) )
+			ranks = np.append( ranks, new_rank )
+			_, expected = Survival.FastNonDominatedSorting( objectives )
+			assert np.array_equal( ranks, expected )
+
+
+def _GetSteadyStateAlgorithm( population ):
+	np.random.seed(1)
+	X = np.random.randn( 30, 2 )
+	y = X[:,0] + 1
+	fitness_function = SymbolicRegressionFitness( X, y )
+	nsgp = pyNSGP( fitness_function, [ AddNode(), MulNode() ], [ FeatureNode(0), FeatureNode(1) ], pop_size=len(population), steady_state=True )
+	for p in population:
+		fitness_function.Evaluate( p )
+	nsgp.population = Population( population )
+	nsgp._RankForSteadyState()
+	return nsgp
+
+
+def _GetKeptByPenalizeDuplicates( nsgp, population, o ):
+	PO = Population( population + [o] )
+	nsgp._ComputeFronts( PO )
+	return [ p for p, rank in zip( PO.individuals, PO.ranks.tolist() ) if np.isfinite( rank ) ]
+
+
+def test_smaller_duplicate_replaces_larger_one():
+	# x0 + x1*0 has the same output as x0, with more nodes
+	large = Tree( AddNode(), [ FeatureNode(0), Tree( MulNode(), [ FeatureNode(1), Constant(0.0) ] ) ] )
+	population = [ large, FeatureNode(1), Tree( MulNode(), [ FeatureNode(0), FeatureNode(1) ] ) ]
+	nsgp = _GetSteadyStateAlgorithm( population )
+	o = FeatureNode(0)
+	nsgp.fitness_function.Evaluate( o )
+	assert o.cached_output == large.cached_output
+
+	expected = _GetKeptByPenalizeDuplicates( nsgp, population, o )
+	nsgp._InsertIntoPopulation( o )
+	assert o in expected and large not in expected
+	assert o in nsgp.population.individuals and large not in nsgp.population.individuals
+	assert len(nsgp.population) == len(population)
+	_, ranks = Survival.FastNonDominatedSorting( nsgp.population.objectives )
+	assert np.array_equal( nsgp.population.ranks, ranks )
+
+
+def test_larger_duplicate_is_discarded():
+	small = FeatureNode(0)
+	population = [ small, FeatureNode(1), Tree( MulNode(), [ FeatureNode(0), FeatureNode(1) ] ) ]
+	nsgp = _GetSteadyStateAlgorithm( population )
+	o = Tree( AddNode(), [ FeatureNode(0), Tree( MulNode(), [ FeatureNode(1), Constant(0.0) ] ) ] )
+	nsgp.fitness_function.Evaluate( o )
+
+	expected = _GetKeptByPenalizeDuplicates( nsgp, population, o )
+	nsgp._InsertIntoPopulation( o )
+	assert o not in expected and small in expected
+	assert nsgp.population.individuals == population
+
+
+def test_steady_state_run_keeps_ranks_consistent():
+	np.random.seed(2)
+	X = np.random.randn( 50, 2 )
+	y = X[:,0] * X[:,1] + X[:,0]
+	nsgp = pyNSGP( SymbolicRegressionFitness( X, y ), [ AddNode(), SubNode(), MulNode() ], [ EphemeralRandomConstantNode(), FeatureNode(0), FeatureNode(1) ],
+		pop_size=20, max_generations=5, steady_state=True )
+	nsgp.Run()
+	P = nsgp.population
+	assert len(P) == 20
+	ranked = np.isfinite( P.ranks )
+	_, ranks = Survival.FastNonDominatedSorting( P.objectives[ranked] )
+	assert np.array_equal( P.ranks[ranked], ranks )
+	fingerprints = [ P.individuals[i].cached_output for i in np.flatnonzero( ranked ).tolist() ]
+	assert len(set(fingerprints)) == len(fingerprints)
@@ -0,0 +1,35 @@
+import numpy as np
+
+from pynsgp.Nodes.SymbolicRegressionNodes import *
+from pynsgp.Fitness.FitnessFunction import SymbolicRegressionFitness
+from pynsgp.Fitness.Streaming import ChunkedDataset
+from pynsgp.Evolution.Evolution import pyNSGP
+
+
+def _GetData():
+	np.random.seed(0)
+	X = np.random.randn(250, 3)
+	y = X[:,0]*X[:,1] + X[:,2]
+	return X, y
+
+
+def test_fit_on_chunk_iterator():
+	X, y = _GetData()
+	dataset = ChunkedDataset( chunk_size=64, chunk_iterator_factory=lambda: ( (X[i:i+64], y[i:i+64]) for i in range(0, len(y), 64) ) )
+	fitness_function = SymbolicRegressionFitness( dataset, None )
+	nsgp = pyNSGP( fitness_function, [ AddNode(), SubNode(), MulNode() ], [ FeatureNode(i) for i in range(3) ],
+		pop_size=20, max_generations=3 )
+	nsgp.Run()
+
+	assert fitness_function.n_training_rows == len(y)
+	assert fitness_function.rows_evaluated == fitness_function.evaluations * len(y)
+	assert np.isfinite( fitness_function.elite.objectives[0] )
+
+
+def test_streamed_error_equals_in_memory_error():
+	X, y = _GetData()
+	tree = MulNode()
+	tree.SetChildren( [ FeatureNode(0), FeatureNode(1) ] )
+	in_memory = SymbolicRegressionFitness( X, y )
+	streamed = SymbolicRegressionFitness( X, y, chunk_size=64 )
+	assert np.isclose( in_memory.EvaluateMeanSquaredError( tree ), streamed.EvaluateMeanSquaredError( tree ) )
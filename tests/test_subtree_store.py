@@ -0,0 +1,77 @@
+import numpy as np
+
+from pynsgp.Nodes.SymbolicRegressionNodes import *
+from pynsgp.Nodes.PrimitiveSet import PrimitiveSet
+from pynsgp.Nodes.SubtreeStore import SubtreeStore
+from pynsgp.Fitness.FitnessFunction import SymbolicRegressionFitness
+from pynsgp.Evolution.Evolution import pyNSGP
+
+
+FUNCTIONS = [ AddNode(), SubNode(), MulNode(), AnalyticQuotientNode(), SinNode() ]
+TERMINALS = [ EphemeralRandomConstantNode(), FeatureNode(0), FeatureNode(1) ]
+
+
+def _GetRandomTrees( how_many ):
+	# few terminals and small trees, so that many subtrees are shared
+	primitive_set = PrimitiveSet( FUNCTIONS, [ FeatureNode(0), FeatureNode(1) ] )
+	return [ primitive_set.GenerateRandomTree( 3 ) for _ in range( how_many ) ]
+
+
+def test_interned_trees_evaluate_identically():
+	np.random.seed(0)
+	X = np.random.randn( 20, 2 )
+	store = SubtreeStore()
+	trees = _GetRandomTrees( 100 )
+	interned = [ store.Intern( tree ) for tree in trees ]
+	for tree, root in zip( trees, interned ):
+		assert root is not tree
+		assert root.GetHumanExpression() == tree.GetHumanExpression()
+		assert np.array_equal( root.GetOutput( X ), tree.GetOutput( X ) )
+	assert len(store) < sum( [ tree.GetSize() - 1 for tree in trees ] )
+
+
+def test_counts_reach_zero_when_all_trees_are_released():
+	np.random.seed(1)
+	X = np.random.randn( 20, 2 )
+	store = SubtreeStore()
+	trees = _GetRandomTrees( 100 )
+	interned = [ store.Intern( tree ) for tree in trees ]
+	# interning an interned tree shares its subtrees
+	interned += [ store.Intern( root ) for root in interned[:30] ]
+	expected = [ root.GetOutput( X ) for root in interned ]
+
+	order = np.random.permutation( len(interned) ).tolist()
+	for k, i in enumerate( order ):
+		store.Release( interned[i] )
+		# the trees that are still held are not affected
+		for j in order[k+1:k+6]:
+			assert np.array_equal( interned[j].GetOutput( X ), expected[j] )
+	assert len(store) == 0 and store._counts == {} and store._hashes == {}
+
+
+def test_counts_reach_zero_after_evolution():
+	np.random.seed(2)
+	X = np.random.randn( 50, 2 )
+	y = X[:,0] * X[:,1] + X[:,0]
+	nsgp = pyNSGP( SymbolicRegressionFitness( X, y ), FUNCTIONS, TERMINALS, pop_size=30, max_generations=5,
+		use_copy_on_write=True, use_hash_consing=True )
+	nsgp.Run()
+	store = nsgp.subtree_store
+	assert len(store) > 0
+	for p in nsgp.population.individuals:
+		store.Release( p )
+	assert len(store) == 0 and store._counts == {}
+
+
+def test_dag_errors_match_plain_evaluation():
+	np.random.seed(3)
+	X = np.random.randn( 40, 2 )
+	y = np.sin( X[:,0] ) + X[:,1]
+	store = SubtreeStore()
+	trees = [ store.Intern( tree ) for tree in _GetRandomTrees( 100 ) ]
+	fitness_function = SymbolicRegressionFitness( X, y )
+	fitness_function.EvaluateBatch( trees, n_jobs=1, backend='dag' )
+	for tree in trees:
+		error, a, b, fingerprint = fitness_function.ComputeError( tree.GetOutput( X ) )
+		assert tree.objectives[0] == error
+		assert (tree.ls_a, tree.ls_b, tree.cached_output) == (a, b, fingerprint)
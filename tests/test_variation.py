@@ -0,0 +1,71 @@
+import numpy as np
+from copy import deepcopy
+
+from pynsgp.Nodes.SymbolicRegressionNodes import *
+from pynsgp.Nodes.PrimitiveSet import PrimitiveSet
+from pynsgp.Variation import Variation
+from pynsgp.Fitness.FitnessFunction import SymbolicRegressionFitness
+from pynsgp.Evolution.Evolution import pyNSGP
+
+
+FUNCTIONS = [ AddNode(), SubNode(), MulNode(), SinNode(), CosNode() ]
+TERMINALS = [ EphemeralRandomConstantNode(), FeatureNode(0), FeatureNode(1) ]
+
+
+def _VaryTwice( vary, parent, donor ):
+	# expressions of the offspring of vary with the legacy deepcopy and with copy-on-write, under the same
+	# random numbers; new constants draw their values when first read, so right after each call. Copy-on-write
+	# does not maintain the parent links of shared nodes, which the legacy operators use, so each gets its
+	# own copies of parent and donor
+	expression, donor_expression = parent.GetHumanExpression(), donor.GetHumanExpression()
+	shared_parent, shared_donor = deepcopy(parent), deepcopy(donor)
+	state = np.random.get_state()
+	legacy = vary( deepcopy(parent), deepcopy(donor), False )
+	legacy_expression = legacy.GetHumanExpression()
+	np.random.set_state( state )
+	o = vary( shared_parent, shared_donor, True )
+	o_expression = o.GetHumanExpression()
+	assert shared_parent.GetHumanExpression() == expression and shared_donor.GetHumanExpression() == donor_expression
+	return legacy_expression, o_expression
+
+
+def test_copy_on_write_equals_deepcopy_variation():
+	np.random.seed(0)
+	primitive_set = PrimitiveSet( FUNCTIONS, TERMINALS )
+	operators = [
+		lambda p, d, cow: Variation.SubtreeCrossover( p, d, copy_on_write=cow ),
+		lambda p, d, cow: Variation.SubtreeMutation( p, FUNCTIONS, TERMINALS, max_height=3, copy_on_write=cow, primitive_set=primitive_set ),
+		lambda p, d, cow: Variation.OnePointMutation( p, FUNCTIONS, TERMINALS, copy_on_write=cow, primitive_set=primitive_set ),
+	]
+	for _ in range( 200 ):
+		parent = primitive_set.GenerateRandomTree( 4 )
+		donor = primitive_set.GenerateRandomTree( 4 )
+		for vary in operators:
+			legacy_expression, expression = _VaryTwice( vary, parent, donor )
+			assert expression == legacy_expression
+
+
+def test_copy_on_write_evolution_equals_legacy_evolution():
+	X = np.random.RandomState(1).randn( 50, 2 )
+	y = X[:,0] * X[:,1] + X[:,0]
+	fronts = []
+	for use_copy_on_write in [ False, True ]:
+		np.random.seed(1)
+		nsgp = pyNSGP( SymbolicRegressionFitness( X, y ), FUNCTIONS, TERMINALS, pop_size=30, max_generations=5, use_copy_on_write=use_copy_on_write )
+		nsgp.Run()
+		fronts.append( [ (p.GetHumanExpression(), p.objectives) for p in nsgp.population.individuals ] )
+	assert fronts[0] == fronts[1]
+
+
+def test_offspring_leave_the_population_unchanged():
+	np.random.seed(2)
+	X = np.random.randn( 50, 2 )
+	y = X[:,0] - X[:,1]
+	nsgp = pyNSGP( SymbolicRegressionFitness( X, y ), FUNCTIONS, TERMINALS, pop_size=30, use_copy_on_write=True )
+	nsgp.Initialize()
+	parents = nsgp.population.individuals
+	expressions = [ p.GetHumanExpression() for p in parents ]
+	for i in range( 100 ):
+		o, _ = nsgp._Vary( parents[i % 30], lambda: parents[ np.random.randint( 30 ) ] )
+		assert o is not parents[i % 30]
+	assert [ p.GetHumanExpression() for p in parents ] == expressions